@@ -1,2 +1,2 @@
-from .alanapy import Datasource, DCA, FDP, Economics, AIML, DatasourceEDA, WellType, Petrophysics, General, Generic
-from .alanaResults import ResultsParser, WellResultsParser, ProdResultsParser, ProdResultsParserAggregated
\ No newline at end of file
+from .alanapy import Datasource, DCA, FDP, Economics, AIML, DatasourceEDA, WellType, Petrophysics, General, Generic, WellSpatialIndex, ArpsEngine, ResultCache, AlanaJob, JobPool, EconomicsEngine
+from .alanaResults import ResultsParser, WellResultsParser, ProdResultsParser, ProdResultsParserAggregated, ProximityResultsParser
\ No newline at end of file
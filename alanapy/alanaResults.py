@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 #import alanapy
 import matplotlib.pyplot as plt
 from bokeh.plotting import figure, show, output_notebook
@@ -275,3 +276,39 @@ class ProdResultsParserAggregated(ResultsParser):
 class PetroResultsParser(ResultsParser):
     pass
 
+class ProximityResultsParser(ResultsParser):
+    """
+    Sparse well adjacency (CSR layout: well_names, indptr, indices, distances) returned by proximity queries.
+    `df` and `list` expand it to one row per neighbour pair, the same layout as getNearByWells.
+    """
+    @property
+    def csr(self):
+        return self.response
+
+    @property
+    def df(self):
+        if self._df is None:
+            names = np.asarray(self.response["well_names"])
+            counts = np.diff(self.response["indptr"])
+            self._df = pd.DataFrame({
+                "reference_well_name": np.repeat(names, counts),
+                "well_name": names[self.response["indices"]],
+                "distance": self.response["distances"],
+            })
+        return self._df
+
+    @property
+    def list(self):
+        if self._list is None:
+            self._list = self.df.to_dict(orient="records")
+        return self._list
+
+    def neighbors(self, well_name):
+        """
+        Neighbour names and distances of a single well, read straight from the CSR arrays.
+        """
+        names = np.asarray(self.response["well_names"])
+        row = int(np.flatnonzero(names == well_name)[0])
+        start, stop = self.response["indptr"][row], self.response["indptr"][row + 1]
+        return pd.DataFrame({"well_name": names[self.response["indices"][start:stop]],
+                             "distance": self.response["distances"][start:stop]})
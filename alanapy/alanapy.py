@@ -3,13 +3,23 @@
 ####
 import requests
 from requests.exceptions import HTTPError
+from urllib3.exceptions import NewConnectionError
 import datetime
 from datetime import datetime
 import json
+import copy
+import io
+import time
 import numpy as np
 import pandas as pd
 import os
-from collections import defaultdict
+import hashlib
+import warnings
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import defaultdict, OrderedDict
+import itertools
 import importlib.resources as resources
 import yaml
 from typing import Optional
@@ -569,19 +579,118 @@ class AlanaPyHelper:
         }
         """
         mygeneric = Generic()
-        url = self.root_url + "/api/" + case_app + "/" + case_table + "/"
-        header = {'Authorization': 'Token ' + self.credentials["alana_token"],
-                  "content-type": "application/json"}
         #data = {}
         #data["instances"] = list_of_dicts
         #data["has_many"] = True
         #data = json.dumps(data)
-        data = json.dumps(list_of_dicts)
-        mydata = requests.post(url, headers=header, data=data)  # .json()
+        mydata = self._postCases(list_of_dicts, case_app, case_table)
         mygeneric.statusCodeCheck(mydata)
         results = mydata.json()
         return results
 
+    def _postCases(self, list_of_dicts, case_app, case_table, int_retries=0, str_body=None):
+        """
+        Internal Function
+        POST a list_of_dicts (or an already serialised str_body) to a case table and return the raw response so callers can check the status
+        """
+        url = self.root_url + "/api/" + case_app + "/" + case_table + "/"
+        header = {'Authorization': 'Token ' + self.credentials["alana_token"],
+                  "content-type": "application/json"}
+        data = str_body if str_body is not None else json.dumps(list_of_dicts)
+        return self._requestNoResend("post", url, int_retries=int_retries, headers=header, data=data)
+
+    def _createCasesBatched(self, list_of_dicts, case_app, case_table, int_batch_size=500, int_max_bytes=5000000,
+                            int_workers=4, int_retries=2, list_bodies=None):
+        """
+        }
+        "description": "Create cases in batches bounded by int_batch_size records and int_max_bytes of json, posted in parallel. A batch rejected with a 4xx is split in halves until the failing records are isolated, so one bad record does not sink its batch. Creates are not idempotent: a batch is only resent when its connection could not be opened, a 5xx, 429 or timeout marks every record of the batch as error since the server may have stored it",
+        "arguments" : {
+            "list_of_dicts" : [{dict_case_1},{dict_case_2}],
+            "case_app" : "str",
+            "case_table" : "str",
+            "int_batch_size" : 500,
+            "int_max_bytes" : 5000000,
+            "int_workers" : 4,
+            "int_retries" : 2,
+            "list_bodies" : "None | records already serialised to json (e.g. Generic.dataFrameToJsonRecords), list_of_dicts is then ignored"
+            },
+        "return": [{"status": "created | error", "response": "created item or None", "error": "None | str"}],
+        }
+        """
+        if list_bodies is None:
+            list_bodies = [json.dumps(x) for x in list_of_dicts]
+        list_outcomes = [None] * len(list_bodies)
+        list_batches, list_current, int_bytes = [], [], 2
+        for n, str_body in enumerate(list_bodies):
+            if list_current and (len(list_current) >= int_batch_size or int_bytes + len(str_body) + 1 > int_max_bytes):
+                list_batches.append(list_current)
+                list_current, int_bytes = [], 2
+            list_current.append(n)
+            int_bytes += len(str_body) + 1
+        if list_current:
+            list_batches.append(list_current)
+
+        def _post(list_indices):
+            str_body = "[" + ",".join(list_bodies[i] for i in list_indices) + "]"
+            bool_rejected = False
+            try:
+                mydata = self._postCases(None, case_app, case_table, int_retries=int_retries, str_body=str_body)
+                bool_status = 200 <= mydata.status_code < 300
+                bool_rejected = 400 <= mydata.status_code < 500 and mydata.status_code != 429
+                str_error = None if bool_status else f"{mydata.status_code}: {mydata.text[:500]}"
+            except requests.exceptions.RequestException as err:
+                bool_status, str_error = False, f"{type(err).__name__}: {err}"
+            if bool_status:
+                try:
+                    response = mydata.json()
+                except ValueError:
+                    response = None
+                list_items = response if isinstance(response, list) and len(response) == len(list_indices) \
+                    else [response] * len(list_indices)
+                for i, item in zip(list_indices, list_items):
+                    list_outcomes[i] = {"status": "created", "response": item, "error": None}
+            elif len(list_indices) == 1 or not bool_rejected:
+                # Only a validation rejection is known to have stored nothing, anything else is not resent
+                for i in list_indices:
+                    list_outcomes[i] = {"status": "error", "response": None, "error": str_error}
+            else:
+                int_half = len(list_indices) // 2
+                _post(list_indices[:int_half])
+                _post(list_indices[int_half:])
+
+        with ThreadPoolExecutor(max_workers=int_workers) as executor:
+            list(executor.map(_post, list_batches))
+        int_failed = sum(1 for x in list_outcomes if x["status"] == "error")
+        print(f"Created {len(list_outcomes) - int_failed}/{len(list_outcomes)} {case_table} records in {len(list_batches)} batches")
+        return list_outcomes
+
+    def _uploadCases(self, data, case_app, case_table, int_batch_size=500, int_workers=4, bool_outcomes=False):
+        """
+        }
+        "description": "Create cases from a list_of_dicts or a DataFrame. A DataFrame is serialised column-wise (dates as YYYY-MM-DD, NaN/NaT as null) without building a dict per row. By default every record goes in one POST and the server response is returned as _createCases does; with bool_outcomes the records are posted through _createCasesBatched in parallel, non-atomic batches of int_batch_size and one outcome per record is returned",
+        "arguments" : {
+            "data" : "[{dict_case_1},{dict_case_2}] | DataFrame",
+            "case_app" : "str",
+            "case_table" : "str",
+            "int_batch_size" : 500,
+            "int_workers" : 4,
+            "bool_outcomes" : False
+            },
+        "return": "Response_api | with bool_outcomes [{'status': 'created | error', 'response': 'created item or None', 'error': 'None | str'}]",
+        "example": ""
+        }
+        """
+        list_bodies = Generic().dataFrameToJsonRecords(data) if isinstance(data, pd.DataFrame) else None
+        if bool_outcomes:
+            return self._createCasesBatched(data if list_bodies is None else None, case_app, case_table,
+                                            int_batch_size=int_batch_size, int_workers=int_workers,
+                                            list_bodies=list_bodies)
+        if list_bodies is None:
+            return self._createCases(data, case_app, case_table)
+        mydata = self._postCases(None, case_app, case_table, str_body="[" + ",".join(list_bodies) + "]")
+        Generic().statusCodeCheck(mydata)
+        return mydata.json()
+
     def _createMasterCases(self, master_app, master_table, master_dict, list_of_dicts, case_app, case_table):
         """
         }
@@ -626,6 +735,18 @@ class AlanaPyHelper:
         print(mydata.status_code)
         return results
 
+    def _putCase(self, case_app, case_table, dict_case, case_fk, int_retries=2):
+        """
+        Internal Function
+        Quiet counterpart of _editMaster for bulk updates: PUT one case (idempotent, so retried on connection
+        errors, 429 and 5xx) and return the raw response without printing, the caller reports the outcome
+        """
+        url = self.root_url + "/api/" + case_app + "/" + case_table + "/" + str(case_fk) + "/"
+        header = {'Authorization': 'Token ' + self.credentials["alana_token"],
+                  "content-type": "application/json"}
+        return self._requestWithRetry("put", url, int_retries=int_retries, headers=header,
+                                      data=json.dumps(dict_case))
+
     def _fitForecastDCA(self, dates, rates, dca_template_fit_forecast):
         url = self.root_url + "/api/dca/fit_forecast/"
         dca_template_fit_forecast = json.dumps(dca_template_fit_forecast)
@@ -637,6 +758,24 @@ class AlanaPyHelper:
         return dca_forecast
     
     def _saveDCA(self, dcamaster_fk, well_fk, dca_forecast, x_selected, rates, dca_template_fit_forecast):
+        dca_save_dict = self._buildDCASaveDict(dcamaster_fk, well_fk, dca_forecast, x_selected, rates,
+                                               dca_template_fit_forecast)
+        try:
+            dca_save_dict = json.dumps(dca_save_dict)
+        except:
+            return dca_save_dict
+        url = self.root_url + "/api/dca/dcacase/"
+        header = {'Authorization': 'Token ' + self.credentials["alana_token"],
+                  "content-type": "application/json"}
+        mydata = requests.post(url, headers=header, data=dca_save_dict)  # .json()
+        dca_save = mydata.json()
+        return dca_save, dca_save_dict
+
+    def _buildDCASaveDict(self, dcamaster_fk, well_fk, dca_forecast, x_selected, rates, dca_template_fit_forecast):
+        """
+        Internal Function
+        Build the dcacase payload from a fit_forecast template and its forecast
+        """
         dca_save_dict = dca_template_fit_forecast
         dca_save_dict['fit_type'] = 'AUTO'
         dca_save_dict['secondary_forecast_type'] = 'RATIO'
@@ -676,17 +815,113 @@ class AlanaPyHelper:
             'fc_date_choice': 'DEFAULT',
             'fc_rate_choice': 'LASTVAL'
         }
-        try:
-            dca_save_dict = json.dumps(dca_save_dict)
-        except:
-            return dca_save_dict
-        url = self.root_url + "/api/dca/dcacase/"
-        header = {'Authorization': 'Token ' + self.credentials["alana_token"],
-                  "content-type": "application/json"}
-        mydata = requests.post(url, headers=header, data=dca_save_dict)  # .json()
-        dca_save = mydata.json()
-        return dca_save, dca_save_dict
-    
+        return dca_save_dict
+
+    def _requestWithRetry(self, method, url, int_retries=3, float_backoff=1.0, **kwargs):
+        """
+        {
+        "description": "Send a request and retry it on connection errors, 429 and 5xx responses with exponential backoff",
+        "arguments" : {
+            "method" : "get | post | put | delete",
+            "url" : "str",
+            "int_retries" : 3,
+            "float_backoff" : 1.0,
+            "kwargs" : "forwarded to requests.request (headers, params, data, files)"
+            },
+        "return": "requests.Response of the last attempt"
+        }
+        """
+        response = None
+        for int_attempt in range(int_retries + 1):
+            try:
+                response = requests.request(method, url, **kwargs)
+                if response.status_code < 500 and response.status_code != 429:
+                    return response
+            except requests.exceptions.RequestException as err:
+                if int_attempt == int_retries:
+                    raise
+                self._print(f"Retrying {url} after error: {err}")
+            if int_attempt < int_retries:
+                time.sleep(float_backoff * 2 ** int_attempt)
+        return response
+
+    def _requestNoResend(self, method, url, int_retries=3, float_backoff=1.0, **kwargs):
+        """
+        {
+        "description": "Send a non-idempotent request (create, append). It is only retried when the connection could not be opened, so the server never received it; a 5xx, 429 or timeout is returned or raised as is because the server may have applied it",
+        "arguments" : {
+            "method" : "post | put",
+            "url" : "str",
+            "int_retries" : 3,
+            "float_backoff" : 1.0,
+            "kwargs" : "forwarded to requests.request (headers, params, data, files)"
+            },
+        "return": "requests.Response"
+        }
+        """
+        for int_attempt in range(int_retries + 1):
+            try:
+                return requests.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError as err:
+                if not self._isUnsentError(err) or int_attempt == int_retries:
+                    raise
+                self._print(f"Retrying {url} after error: {err}")
+            time.sleep(float_backoff * 2 ** int_attempt)
+
+    @staticmethod
+    def _isUnsentError(err):
+        """
+        Internal Function
+        True when a requests error was raised before the request reached the server (connection not opened)
+        """
+        if isinstance(err, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(err.args[0], "reason", None) if isinstance(err, requests.exceptions.ConnectionError) and \
+            err.args else None
+        return isinstance(reason, NewConnectionError)
+
+    _template_lock = threading.Lock()
+
+    def _getTemplate(self, endpoint, bool_refresh=False):
+        """
+        Session-wide cache of the server templates (GET endpoint). The first call fetches, later calls cost no
+        request. Every caller gets its own deep copy, so per-well payloads can be edited freely
+        """
+        with self._template_lock:
+            if not hasattr(self, "template_cache"):
+                self.template_cache = {}
+            dict_entry = self.template_cache.get(endpoint)
+            if dict_entry is None or bool_refresh:
+                mydata = requests.get(self.root_url + endpoint, headers=self.header)
+                template = mydata.json()
+                dict_entry = {"template": template, "version": ResultCache.fingerprint(template)[:12],
+                              "fetched_at": time.time()}
+                self.template_cache[endpoint] = dict_entry
+        return copy.deepcopy(dict_entry["template"])
+
+    def _getTemplateVersion(self, endpoint):
+        """
+        Content hash of the cached template, it changes only when a refresh brings a different template
+        """
+        self._getTemplate(endpoint)
+        return self.template_cache[endpoint]["version"]
+
+    def clearTemplateCache(self):
+        with self._template_lock:
+            self.template_cache = {}
+
+    def _getJobPool(self, int_max_concurrent: Optional[int] = None):
+        """
+        Session JobPool used by the submit* functions; a new cap replaces the pool for later submissions. The
+        previous pool is shut down without waiting: its jobs still run to completion, then its threads exit
+        """
+        job_pool = getattr(self, "job_pool", None)
+        if job_pool is None or (int_max_concurrent is not None and job_pool.int_max_concurrent != int_max_concurrent):
+            if job_pool is not None:
+                job_pool.shutdown(wait=False)
+            self.job_pool = JobPool(int_max_concurrent=int_max_concurrent or 8)
+        return self.job_pool
+
     def _getKeyFromDict(self, val, dict_selected):
         """
         Function that obtains the key of a given dictionary based on the value
@@ -774,23 +1009,333 @@ class Economics:
             raise ValueError("alanapy is not initialized. Please provide token and root_url.")
 
 
-    def runEconomics(self, params={}):
+    # runEconomics params that reference a master, and the table whose updated_at versions it
+    ECONOMICS_MASTER_PARAMS = {
+        "economicforecastmaster_fk": "economicforecastmaster",
+        "forecastmaster_fk": "economicforecastmaster",
+        "capexmaster_fk": "capexmaster",
+        "opexmaster_fk": "opexmaster",
+        "pricedeck_fk": "pricedeck",
+        "pricemaster_fk": "pricedeck",
+        "economicmaster_fk": "economicmaster",
+        "abandonmentmaster_fk": "abandonmentmaster",
+    }
+
+    def runEconomics(self, params={}, bool_use_cache: bool = True):
         """
         {
-        "description":,
-        "returns":,
-        "example":,
+        "description": "Run the server economics. Successful results are memoized in the session economics cache (see setEconomicsCache) under a fingerprint of params and the updated_at of every master they reference (one small request per master), so an unchanged scenario returns without a run and editing any input master invalidates it. Params referencing anything outside ECONOMICS_MASTER_PARAMS (e.g. economicscenario_fk), or a master without a known updated_at, are not cached",
+        "arguments": {"params": "runEconomics params, e.g. {'economicforecastmaster_fk': 4, 'capexmaster_fk': 2, ...}", "bool_use_cache": True},
+        "return": "runEconomics response",
+        "example": "myeco.runEconomics(params)"
         }
         """
         if len(params) == 0:
             return "Please provide the params dictionary, refer to the documentation of this function"
+        str_key = self._economicsCacheKey(params) if bool_use_cache else None
+        if str_key is not None:
+            cached = self.getEconomicsCache().get(str_key)
+            if cached is not None:
+                return cached
 
         url = self.master.root_url + "/api/economics/runeconomics/"
         header = self.master.header
         mydata = requests.get(url, headers=header, params=params)  # .json()
         results = mydata.json()
+        if str_key is not None and mydata.status_code == 200:
+            self.getEconomicsCache().set(str_key, results)
         return results
 
+    def setEconomicsCache(self, int_max_items: int = 512, str_cache_dir: Optional[str] = None):
+        """
+        {
+        "description": "Configure the session runEconomics cache: in-memory LRU size and optional on-disk directory",
+        "arguments": {"int_max_items": 512, "str_cache_dir": "None | path"},
+        "return": "ResultCache"
+        }
+        """
+        self.master.economics_cache = ResultCache(int_max_items=int_max_items, str_cache_dir=str_cache_dir)
+        return self.master.economics_cache
+
+    def getEconomicsCache(self):
+        if getattr(self.master, "economics_cache", None) is None:
+            self.setEconomicsCache()
+        return self.master.economics_cache
+
+    def _economicsCacheKey(self, params):
+        """
+        Internal Function
+        Fingerprint of params and the updated_at of the referenced masters (one small detail request per master,
+        not a listing of its table), None when a referenced master has no updated_at to validate against or is not
+        versioned (e.g. economicscenario_fk)
+        """
+        dict_versions = {}
+        dict_refs = {}
+        for key, value in params.items():
+            if value in (None, ""):
+                continue
+            if key in self.ECONOMICS_MASTER_PARAMS:
+                dict_refs[key] = (self.ECONOMICS_MASTER_PARAMS[key], str(value))
+            elif key.endswith("_fk") or key.endswith("_id"):
+                self.master._print(f"{key} is not versioned, runEconomics not cached")
+                return None
+        dict_updated = {}
+        for str_table, str_id in set(dict_refs.values()):
+            mydata = requests.get(self.master.root_url + self.master.urls_suffix_dict[str_table] + str_id + "/",
+                                  headers=self.master.header)
+            try:
+                dict_master = mydata.json() if 200 <= mydata.status_code < 300 else {}
+            except ValueError:
+                dict_master = {}
+            if not isinstance(dict_master, dict) or dict_master.get("updated_at") is None:
+                self.master._print(f"No updated_at for {str_table} {str_id}, runEconomics not cached")
+                return None
+            dict_updated[(str_table, str_id)] = str(dict_master["updated_at"])
+        for key, ref in dict_refs.items():
+            dict_versions[key] = dict_updated[ref]
+        return ResultCache.fingerprint({"root_url": self.master.root_url, "params": params,
+                                        "versions": dict_versions})
+
+    def submitEconomics(self, params: dict, str_job_name: Optional[str] = None, job_pool=None):
+        """
+        {
+        "description": "Non-blocking runEconomics: queues the run on a JobPool (the session pool by default) and returns its AlanaJob. Use job.result() to wait for the results, or JobPool.asCompleted/gather for many runs",
+        "arguments": {"params": "same as runEconomics", "str_job_name": "None | name", "job_pool": "None | JobPool"},
+        "return": "AlanaJob",
+        "example": "jobs = [myeco.submitEconomics(p) for p in list_params]; results = [job.result() for job in jobs]"
+        }
+        """
+        if len(params) == 0:
+            raise ValueError("Please provide the params dictionary, refer to the documentation of runEconomics")
+        job_pool = job_pool or self.master._getJobPool()
+        return job_pool.submit(str_job_name or f"economics {params}", "get", "/api/economics/runeconomics/",
+                               params=params)
+
+    def runEconomicsLocal(self, df_forecast, df_price, df_capex=None, df_opex=None, dict_opex=None,
+                          dict_economic=None, dict_abandonment=None, list_discount_rates=None,
+                          str_scenario_col=None, economicforecastmaster_fk=None):
+        """
+        {
+        "description": "In-process counterpart of runEconomics with EconomicsEngine: monthly revenue, costs and cash flow, NPV at every discount rate and IRR for one or many forecasts at once (one scenario per value of str_scenario_col). Inputs are the rows of the economics tables (e.g. pricecase, capexcase, opexcase) as DataFrames",
+        "arguments": {
+            "df_forecast": "DataFrame[date, oil, gas, wat, (active_wells)], e.g. DCA.forecastDCACases()['df_economics']",
+            "df_price": "DataFrame[date, oil, gas]",
+            "df_capex": "None | DataFrame[date, <investment columns>]",
+            "df_opex": "None | DataFrame[date, fixed_opex, ...]",
+            "dict_opex": "None | opexmaster dict",
+            "dict_economic": "None | {'discount_rate_yearly': 0.1, 'inflation_rate_yearly': 0.0, 'royalty_oil': 0.0, 'royalty_gas': 0.0, 'WI': 1.0}",
+            "dict_abandonment": "None | abandonmentmaster dict",
+            "list_discount_rates": [0.08, 0.1, 0.15],
+            "str_scenario_col": "None | column of df_forecast",
+            "economicforecastmaster_fk": "None | 4, added to the cash flow rows"
+            },
+        "return": {
+            "df_cashflow": "DataFrame with the economicforecastcase columns per scenario and month",
+            "df_summary": "DataFrame scenario, npv_<rate>, irr, total_revenue, total_cost, cash_flow",
+            "list_cashflow": "df_cashflow as records (scenario column dropped), ready for createEconomicForecastCases"
+            },
+        "example": "myeco.runEconomicsLocal(df_forecast, df_price, dict_economic={'discount_rate_yearly': 0.1}, list_discount_rates=[0.1, 0.15])"
+        }
+        """
+        myengine = EconomicsEngine()
+        dict_run = myengine.run(df_forecast, df_price, df_capex, df_opex, dict_opex, dict_economic, dict_abandonment,
+                                list_discount_rates, str_scenario_col)
+        df_cashflow, df_summary = myengine.toFrames(dict_run, str_scenario_col or "scenario")
+        df_upload = df_cashflow.drop(columns=[str_scenario_col or "scenario"])
+        for col in ("wat_inj", "gas_inj", "steam_inj"):
+            df_upload[col] = None
+        if economicforecastmaster_fk is not None:
+            df_upload["economicforecastmaster_fk"] = economicforecastmaster_fk
+        return {
+            "df_cashflow": df_cashflow,
+            "df_summary": df_summary,
+            "list_cashflow": Generic().dataFrameToRecords(df_upload),
+        }
+
+    SENSITIVITY_MULTIPLIERS = ("price_mult", "opex_mult", "capex_mult", "volume_mult")
+    SENSITIVITY_LOCAL_VARIABLES = SENSITIVITY_MULTIPLIERS + ("discount_rate",)
+    SENSITIVITY_LOCAL_METRICS = ("npv", "irr")
+
+    def runSensitivity(self, params: dict, dict_ranges: dict, str_mode: str = "oat", str_engine: str = "local",
+                       dict_local_inputs: Optional[dict] = None, str_metric: Optional[str] = None,
+                       int_workers: int = 8):
+        """
+        {
+        "description": "Economic sensitivities around a base case. One-at-a-time (oat) moves each variable through its values with the rest at base, grid evaluates every combination; identical parameter sets are evaluated once. The local engine evaluates all cases in one vectorized EconomicsEngine pass over dict_local_inputs (runEconomicsLocal arguments), with variables price_mult, opex_mult, capex_mult, volume_mult and discount_rate. runeconomics takes no multipliers, so the server engine only varies real runEconomics params that are already in params (e.g. alternative pricedeck_fk / capexmaster_fk masters); each case is submitted as a job on a JobPool capped at int_workers and str_metric, required there, is the response key compared",
+        "arguments": {
+            "params": "base runEconomics params (server) or base values, e.g. {'discount_rate': 0.1}",
+            "dict_ranges": "local: {'price_mult': [0.7, 1.3], 'opex_mult': [0.8, 1.2], 'capex_mult': [0.8, 1.2], 'volume_mult': [0.9, 1.1], 'discount_rate': [0.08, 0.12]}, server: {'pricedeck_fk': [3, 4]}",
+            "str_mode": "oat | grid",
+            "str_engine": "local | server",
+            "dict_local_inputs": "{'df_forecast': df, 'df_price': df, ...} for the local engine",
+            "str_metric": "npv (default) | irr for the local engine, response key for the server engine",
+            "int_workers": 8
+            },
+        "return": {
+            "df_results": "DataFrame, one row per evaluated case: the variables and the metric",
+            "df_tornado": "DataFrame variable, low, high (first and last value of each range), metric_low, metric_high, base, swing; sorted by swing (oat only)"
+            },
+        "example": "myeco.runSensitivity({'discount_rate': 0.1}, {'price_mult': [0.7, 1.3]}, dict_local_inputs={'df_forecast': df_fc, 'df_price': df_price})"
+        }
+        """
+        if str_mode not in ("oat", "grid"):
+            raise ValueError("str_mode must be oat or grid")
+        if str_engine == "local":
+            str_metric = str_metric or "npv"
+            if str_metric not in self.SENSITIVITY_LOCAL_METRICS:
+                raise ValueError(f"str_metric must be one of {self.SENSITIVITY_LOCAL_METRICS} for the local engine")
+            list_unknown = [key for key in dict_ranges if key not in self.SENSITIVITY_LOCAL_VARIABLES]
+            if list_unknown:
+                raise ValueError(f"Unsupported local sensitivity variables {list_unknown}, use "
+                                 f"{self.SENSITIVITY_LOCAL_VARIABLES}")
+        elif str_engine == "server":
+            if not str_metric:
+                raise ValueError("str_metric must name the runEconomics response key to compare")
+            list_unknown = [key for key in dict_ranges if key in self.SENSITIVITY_LOCAL_VARIABLES or key not in params]
+            if list_unknown:
+                raise ValueError(f"runEconomics has no {list_unknown} params: the server engine varies params already "
+                                 f"in the base case (e.g. alternative masters), multipliers need str_engine='local'")
+        else:
+            raise ValueError("str_engine must be local or server")
+        dict_base = {key: value for key, value in params.items()}
+        for key in dict_ranges:
+            dict_base.setdefault(key, 1.0 if key in self.SENSITIVITY_MULTIPLIERS else None)
+        list_cases = [dict(dict_base)]
+        if str_mode == "oat":
+            for key, list_values in dict_ranges.items():
+                list_cases += [{**dict_base, key: value} for value in list_values]
+        else:
+            list_keys = list(dict_ranges)
+            list_cases += [{**dict_base, **dict(zip(list_keys, values))}
+                           for values in itertools.product(*[dict_ranges[key] for key in list_keys])]
+        dict_unique = {}
+        for dict_case in list_cases:
+            dict_unique.setdefault(ResultCache.fingerprint(dict_case), dict_case)
+        list_unique = list(dict_unique.values())
+        if str_engine == "local":
+            list_metrics = self._sensitivityLocal(list_unique, dict_local_inputs or {}, str_metric)
+        else:
+            job_pool = JobPool(int_max_concurrent=int_workers)
+            list_jobs = [self.submitEconomics(dict_case, str_job_name=str(n), job_pool=job_pool)
+                         for n, dict_case in enumerate(list_unique)]
+            list_metrics = []
+            try:
+                for job in list_jobs:
+                    job.wait()
+                    if job.status != "done":
+                        print(f"Sensitivity case {job.name} failed: {job.error}")
+                        list_metrics.append(None)
+                    elif not isinstance(job.result_data, dict) or str_metric not in job.result_data:
+                        raise ValueError(f"runEconomics response has no {str_metric!r} key: "
+                                         f"{list(job.result_data) if isinstance(job.result_data, dict) else job.result_data}")
+                    else:
+                        list_metrics.append(job.result_data[str_metric])
+            finally:
+                job_pool.shutdown(wait=False)
+        df_results = pd.DataFrame(list_unique)
+        df_results[str_metric] = list_metrics
+        df_tornado = None
+        if str_mode == "oat":
+            dict_metric = {ResultCache.fingerprint(dict_case): metric for dict_case, metric in
+                           zip(list_unique, list_metrics)}
+            base = dict_metric[ResultCache.fingerprint(dict_base)]
+            list_rows = []
+            for key, list_values in dict_ranges.items():
+                low, high = list_values[0], list_values[-1]
+                metric_low = dict_metric[ResultCache.fingerprint({**dict_base, key: low})]
+                metric_high = dict_metric[ResultCache.fingerprint({**dict_base, key: high})]
+                list_rows.append({"variable": key, "low": low, "high": high, "metric_low": metric_low,
+                                  "metric_high": metric_high, "base": base,
+                                  "swing": abs(metric_high - metric_low) if None not in (metric_low, metric_high)
+                                  else None})
+            df_tornado = pd.DataFrame(list_rows).sort_values("swing", ascending=False,
+                                                             na_position="last").reset_index(drop=True)
+        return {"df_results": df_results, "df_tornado": df_tornado}
+
+    def _sensitivityLocal(self, list_cases, dict_local_inputs, str_metric):
+        """
+        Internal Function
+        Every sensitivity case as one scenario row of a single EconomicsEngine run over one forecast
+        """
+        if "df_forecast" not in dict_local_inputs or "df_price" not in dict_local_inputs:
+            raise ValueError("dict_local_inputs needs at least df_forecast and df_price for the local engine")
+        dict_economic = dict(dict_local_inputs.get("dict_economic") or {})
+        float_base_rate = float(dict_economic.get("discount_rate_yearly") or 0.1)
+        rates = np.array([float_base_rate if dict_case.get("discount_rate") is None else float(dict_case["discount_rate"])
+                          for dict_case in list_cases])
+        dict_multipliers = {key: np.array([float(dict_case.get(key, 1.0)) for dict_case in list_cases])
+                            for key in self.SENSITIVITY_MULTIPLIERS}
+        myengine = EconomicsEngine()
+        dict_inputs = {key: value for key, value in dict_local_inputs.items() if key != "str_scenario_col"}
+        dict_run = myengine.run(dict_multipliers=dict_multipliers, list_discount_rates=[float_base_rate],
+                                **{key: value for key, value in dict_inputs.items() if key != "list_discount_rates"})
+        cash_flow = dict_run["cash"]["cash_flow"]
+        if str_metric == "irr":
+            return dict_run["irr"].tolist()
+        # Each case is discounted at its own rate
+        return myengine._npvPerScenario(np.ascontiguousarray(cash_flow.T), rates).tolist()
+
+    def runMonteCarloEconomics(self, df_forecast, df_price, df_capex=None, df_opex=None, dict_opex=None,
+                               dict_economic=None, dict_abandonment=None, list_discount_rates=None,
+                               str_scenario_col=None, int_realizations: int = 1000, price_sigma: float = 0.25,
+                               float_price_correlation: float = 0.8, capex_sigma: float = 0.15,
+                               opex_sigma: float = 0.1, volume_sigma: float = 0.0, percentiles=(10, 50, 90),
+                               int_chunk: int = 1000, seed=None):
+        """
+        {
+        "description": "Monte Carlo economics with EconomicsEngine: price paths around the deck and capex / opex / volume uncertainty, evaluated in chunks of int_chunk realizations for every forecast (one per value of str_scenario_col). Inputs are the same as runEconomicsLocal",
+        "arguments": {
+            "df_forecast": "DataFrame[date, oil, gas, wat, (active_wells)]",
+            "df_price": "DataFrame[date, oil, gas], the deck the paths are centred on",
+            "int_realizations": 1000,
+            "price_sigma": "0.25, yearly price volatility",
+            "float_price_correlation": "0.8, oil / gas",
+            "capex_sigma": 0.15,
+            "opex_sigma": 0.1,
+            "volume_sigma": 0.0,
+            "percentiles": [10, 50, 90],
+            "int_chunk": "1000 realizations per vectorized pass",
+            "seed": "None | 42"
+            },
+        "return": {
+            "df_npv": "DataFrame scenario, realization, npv_<rate>",
+            "df_npv_summary": "DataFrame scenario, npv_<rate>_p10 ..., npv_<rate>_mean, npv_<rate>_prob_negative",
+            "df_profiles": "DataFrame scenario, date, cash_flow_p10 ..., cash_flow_mean"
+            },
+        "example": "myeco.runMonteCarloEconomics(df_forecast, df_price, dict_economic={'discount_rate_yearly': 0.1}, int_realizations=5000, seed=1)"
+        }
+        """
+        myengine = EconomicsEngine()
+        dict_mc = myengine.monteCarlo(df_forecast, df_price, df_capex, df_opex, dict_opex, dict_economic,
+                                      dict_abandonment, list_discount_rates, str_scenario_col, int_realizations,
+                                      price_sigma, float_price_correlation, capex_sigma, opex_sigma, volume_sigma,
+                                      percentiles, int_chunk, seed)
+        str_col = str_scenario_col or "scenario"
+        list_npv, list_summary, list_profiles = [], [], []
+        for forecast, dict_result in zip(dict_mc["forecasts"], dict_mc["results"]):
+            npv = dict_result["npv"]
+            df_npv = pd.DataFrame({str_col: forecast, "realization": np.arange(len(npv))})
+            dict_summary = {str_col: forecast}
+            for n, rate in enumerate(dict_mc["discount_rates"]):
+                df_npv[f"npv_{rate:g}"] = npv[:, n]
+                values = np.percentile(npv[:, n], [100 - p for p in dict_mc["percentiles"]])
+                for p, value in zip(dict_mc["percentiles"], values):
+                    dict_summary[f"npv_{rate:g}_p{p}"] = value
+                dict_summary[f"npv_{rate:g}_mean"] = npv[:, n].mean()
+                dict_summary[f"npv_{rate:g}_prob_negative"] = (npv[:, n] < 0).mean()
+            df_profile = pd.DataFrame({str_col: forecast, "date": dict_result["months"].astype("datetime64[D]")})
+            for p, values in zip(dict_mc["percentiles"], dict_result["cash_flow_percentiles"]):
+                df_profile[f"cash_flow_p{p}"] = values
+            df_profile["cash_flow_mean"] = dict_result["cash_flow_mean"]
+            list_npv.append(df_npv)
+            list_summary.append(dict_summary)
+            list_profiles.append(df_profile)
+        return {
+            "df_npv": pd.concat(list_npv, ignore_index=True),
+            "df_npv_summary": pd.DataFrame(list_summary),
+            "df_profiles": pd.concat(list_profiles, ignore_index=True),
+        }
+
     def createEconomicForecastMaster(self, _dict: dict):
         """
         {
@@ -849,7 +1394,8 @@ class Economics:
         deleted_master = self.master._deleteMaster("economics", "economicforecastmaster", str(master_fk))
         return deleted_master
   
-    def createEconomicForecastCases(self, list_of_dicts: list):
+    def createEconomicForecastCases(self, list_of_dicts, int_batch_size: int = 500, int_workers: int = 4,
+                                    bool_outcomes: bool = False):
         """
         Function that creates a case sending the master_fk bind to a Master, sending a list
         list_of_dicts = [{
@@ -891,9 +1437,12 @@ class Economics:
             "economicforecastmaster_fk": 4
         }]
 
-        RETURN Response_api
+        list_of_dicts can also be a DataFrame. bool_outcomes=True uploads in parallel batches of int_batch_size
+        and returns one {status, response, error} outcome per record, in input order
+        RETURN dict Response_api
         """
-        dict_response_api = self.master._createCases(list_of_dicts, "economics", "economicforecastcase")
+        dict_response_api = self.master._uploadCases(list_of_dicts, "economics", "economicforecastcase", int_batch_size,
+                                                     int_workers, bool_outcomes)
         return dict_response_api
 
     def createEconomicForecastMasterCases(self, _dict: dict, list_of_dicts: list):
@@ -928,6 +1477,90 @@ class Economics:
         print(tuple_response_api)
         return tuple_response_api
 
+    def buildScenarioMatrix(self, dict_candidates: dict, economicscenario_fk=None, dict_scenario: Optional[dict] = None,
+                            int_batch_size: int = 500, int_workers: int = 4, bool_submit: bool = False,
+                            dict_run_params: Optional[dict] = None, job_pool=None):
+        """
+        {
+        "description": "Scenario matrix: every combination of the candidate masters becomes an economicscenariocase of one economic scenario (created from dict_scenario when economicscenario_fk is None). Combinations already present in the scenario are skipped using one download of its cases, the rest are created in batches. With bool_submit every existing or created combination of the matrix is submitted as a runEconomics job (its fks merged into dict_run_params), combinations whose creation failed are not submitted",
+        "arguments": {
+            "dict_candidates": {"forecastmaster_fk": [1, 2], "capexmaster_fk": [3, 4], "opexmaster_fk": [5], "abandonmentmaster_fk": [None, 6]},
+            "economicscenario_fk": "None | 8",
+            "dict_scenario": "{'name': 'Screening', 'description': ''} when economicscenario_fk is None",
+            "int_batch_size": 500,
+            "int_workers": 4,
+            "bool_submit": False,
+            "dict_run_params": "None | extra runEconomics params",
+            "job_pool": "None | JobPool, the session pool by default"
+            },
+        "return": {
+            "economicscenario_fk": 8,
+            "df_matrix": "DataFrame with one row per combination: the fks, status existing | created | error and error",
+            "jobs": "None | [AlanaJob or None] in df_matrix order, None where the status is error"
+            },
+        "example": "myeco.buildScenarioMatrix({'forecastmaster_fk': [1, 2], 'capexmaster_fk': [3, 4]}, dict_scenario={'name': 'Screening'}, bool_submit=True)"
+        }
+        """
+        list_keys = list(dict_candidates)
+        if not list_keys:
+            raise ValueError("Please provide at least one list of candidate masters")
+        if economicscenario_fk is None:
+            if not dict_scenario:
+                raise ValueError("Please provide economicscenario_fk or dict_scenario to create the scenario")
+            economicscenario_fk = self.createEconomicScenario(dict_scenario)["id"]
+
+        def _combination_key(dict_case):
+            return tuple(None if dict_case.get(key) in (None, "") else str(dict_case.get(key)) for key in list_keys)
+
+        # Local index of the cases already in the scenario
+        list_existing = self.master._getMaster("economics", "economicscenariocase",
+                                               params={"economicscenario_fk": economicscenario_fk})
+        if isinstance(list_existing, dict):
+            list_existing = list_existing.get("results", [])
+        set_existing = {_combination_key(dict_case) for dict_case in list_existing
+                        if str(dict_case.get("economicscenario_fk")) == str(economicscenario_fk)}
+
+        dict_combinations = {}
+        for values in itertools.product(*[dict_candidates[key] for key in list_keys]):
+            dict_case = dict(zip(list_keys, values))
+            dict_combinations.setdefault(_combination_key(dict_case), dict_case)
+        list_combinations = list(dict_combinations.values())
+        df_matrix = pd.DataFrame({key: pd.Series([dict_case[key] for dict_case in list_combinations], dtype=object)
+                                  for key in list_keys})
+        is_new = np.array([_combination_key(dict_case) not in set_existing for dict_case in list_combinations],
+                          dtype=bool)
+        df_matrix["status"] = np.where(is_new, "created", "existing")
+        df_matrix["error"] = None
+        list_new = [{"description": ", ".join(f"{key} {dict_case[key]}" for key in list_keys),
+                     **dict_case, "economicscenario_fk": economicscenario_fk}
+                    for dict_case, bool_new in zip(list_combinations, is_new) if bool_new]
+        print(f"{len(list_combinations)} combinations, {len(list_combinations) - len(list_new)} already in scenario "
+              f"{economicscenario_fk}")
+        if list_new:
+            list_outcomes = self.master._createCasesBatched(list_new, "economics", "economicscenariocase",
+                                                            int_batch_size=int_batch_size, int_workers=int_workers)
+            index_new = np.flatnonzero(is_new)
+            df_matrix.loc[index_new, "status"] = [x["status"] for x in list_outcomes]
+            df_matrix.loc[index_new, "error"] = [x["error"] for x in list_outcomes]
+
+        list_jobs = None
+        if bool_submit:
+            job_pool = job_pool or self.master._getJobPool()
+            list_jobs = []
+            for dict_case, str_status in zip(list_combinations, df_matrix["status"]):
+                if str_status == "error":
+                    # The case was not created, there is nothing to run
+                    list_jobs.append(None)
+                    continue
+                list_jobs.append(self.submitEconomics(
+                    {**(dict_run_params or {}), "economicscenario_fk": economicscenario_fk,
+                     **{key: value for key, value in dict_case.items() if value is not None}}, job_pool=job_pool))
+            int_errors = int((df_matrix["status"] == "error").sum())
+            if int_errors:
+                print(f"{int_errors} combinations not submitted because their case could not be created, "
+                      f"see df_matrix error")
+        return {"economicscenario_fk": economicscenario_fk, "df_matrix": df_matrix, "jobs": list_jobs}
+
     # def _createEconomicScenarioCase(self, dict_economicscenario : dict, lst_economicscenariocase: dict):
     #     """
     #     Function that takes the given dicts and create a scenario and a case
@@ -995,7 +1628,8 @@ class Economics:
         dict_response_api = self.master._createMaster("economics", "capexmaster", dict_capex)
         return dict_response_api
 
-    def createCapexCases(self, list_of_dicts):
+    def createCapexCases(self, list_of_dicts, int_batch_size: int = 500, int_workers: int = 4,
+                         bool_outcomes: bool = False):
         """
         Function that uploads to the server a list of dicts from a data frame of investments along time
         list_of_dicts = [
@@ -1037,9 +1671,12 @@ class Economics:
         ]
         list_of_dicts = pd.to_dict(df)
         args(list_of_dicts)
+        list_of_dicts can also be a DataFrame. bool_outcomes=True uploads in parallel batches of int_batch_size
+        and returns one {status, response, error} outcome per record, in input order
         RETURN dict Response_api
         """
-        dict_response_api = self.master._createCases(list_of_dicts, "economics", "capexcase")
+        dict_response_api = self.master._uploadCases(list_of_dicts, "economics", "capexcase", int_batch_size,
+                                                     int_workers, bool_outcomes)
         return dict_response_api
 
     def createCapexMasterCases(self, dict_capex: dict, list_of_dicts: list):
@@ -1101,7 +1738,8 @@ class Economics:
         dict_response_api = self.master._createMaster("economics", "opexmaster", dict_opex)
         return dict_response_api
 
-    def createOpexCases(self, list_of_dicts):
+    def createOpexCases(self, list_of_dicts, int_batch_size: int = 500, int_workers: int = 4,
+                        bool_outcomes: bool = False):
         """
         Function that uploads to the server a list of dicts from a data frame of investments along time
         list_of_dicts = [
@@ -1133,9 +1771,12 @@ class Economics:
         }
         ]
         args(list_of_dicts)
+        list_of_dicts can also be a DataFrame. bool_outcomes=True uploads in parallel batches of int_batch_size
+        and returns one {status, response, error} outcome per record, in input order
         RETURN dict Response_api
         """
-        dict_response_api = self.master._createCases(list_of_dicts, "economics", "opexcase")
+        dict_response_api = self.master._uploadCases(list_of_dicts, "economics", "opexcase", int_batch_size,
+                                                     int_workers, bool_outcomes)
         return dict_response_api
 
     def createOpexMasterCases(self, dict_capex: dict, list_of_dicts: list):
@@ -1178,7 +1819,8 @@ class Economics:
         dict_response_api = self.master._createMaster("economics", "pricedeck", dict_price)
         return dict_response_api
 
-    def createPriceCases(self, list_of_dicts):
+    def createPriceCases(self, list_of_dicts, int_batch_size: int = 500, int_workers: int = 4,
+                         bool_outcomes: bool = False):
         """
         Function that uploads to the server a list of dicts from a data frame of investments along time
         list_of_dicts = [
@@ -1199,9 +1841,12 @@ class Economics:
         ]
             list_of_dicts = pd.to_dict(df)
             args(list_of_dicts)
+            list_of_dicts can also be a DataFrame. bool_outcomes=True uploads in parallel batches of int_batch_size
+            and returns one {status, response, error} outcome per record, in input order
             RETURN dict Response_api
             """
-        dict_response_api = self.master._createCases(list_of_dicts, "economics", "pricecase")
+        dict_response_api = self.master._uploadCases(list_of_dicts, "economics", "pricecase", int_batch_size,
+                                                     int_workers, bool_outcomes)
         return dict_response_api
 
     def getPriceDeck(self, master_fk: str):
@@ -1242,7 +1887,8 @@ class Economics:
         dict_response_api = self.master._createMaster("economics", "economicmaster", dict_economic)
         return dict_response_api
 
-    def createEconomicCases(self, list_of_dicts):
+    def createEconomicCases(self, list_of_dicts, int_batch_size: int = 500, int_workers: int = 4,
+                            bool_outcomes: bool = False):
         """
         Function that uploads to the server a list of dicts from a data frame of investments along time
         list_of_dicts = [
@@ -1264,9 +1910,12 @@ class Economics:
 
         list_of_dicts = pd.to_dict(df)
         args(list_of_dicts)
+        list_of_dicts can also be a DataFrame. bool_outcomes=True uploads in parallel batches of int_batch_size
+        and returns one {status, response, error} outcome per record, in input order
         RETURN dict Response_api
         """
-        dict_response_api = self.master._createCases(list_of_dicts, "economics", "economiccase")
+        dict_response_api = self.master._uploadCases(list_of_dicts, "economics", "economiccase", int_batch_size,
+                                                     int_workers, bool_outcomes)
         return dict_response_api
 
     def getEconomicModelMaster(self, master_fk: str):
@@ -1417,6 +2066,25 @@ class FDP:
         mydata = requests.get(url, headers=header, params=params)  # .json()
         results = mydata.json()
         return results
+
+    def submitFDP(self, str_fdp_name, preffix="FDP_", job_pool=None):
+        """
+        {
+            "description": "Non-blocking runFDP: queues the run on a JobPool (the session pool by default) and returns its AlanaJob",
+            "arguments" : {
+                "FDP_master_name" : "str_fdp_master",
+                "Preffix" : "FDP_",
+                "job_pool": "None | JobPool"
+            },
+            "return" : "AlanaJob, job.result() gives the runFDP response"
+        }
+        """
+        params = {
+            "fdpmaster_fk": self.master.fdpmasterdict[str_fdp_name],
+            "preffix": preffix
+        }
+        job_pool = job_pool or self.master._getJobPool()
+        return job_pool.submit(f"fdp {str_fdp_name}", "get", "/api/fdp/runfdp/", params=params)
         
     def createFDPMasterAndCases(self, _dict: dict, list_of_dicts: list):
         """
@@ -1476,12 +2144,15 @@ class FDP:
 
 
 class Datasource:
-    def __init__(self, token=None, root_url=None):
+    def __init__(self, token=None, root_url=None, refresh_masters=True):
         self.master = Singleton().master
         if token and root_url:
             Singleton.initialize(token, root_url)
         elif not Singleton._initialized:
             raise ValueError("alanapy is not initialized. Please provide token and root_url.")
+        if not refresh_masters and getattr(self.master, "wellmasterdict", None) \
+                and hasattr(self.master, "fieldmasterdict") and hasattr(self.master, "formationmasterdict"):
+            return
         # Well dicts
         self.master._wellmasterdict_all = self.master._getGenericDict("wellmaster", fulldict=True)
         self.master.wellmasterdict = self.master._wellmasterdict_all[1]
@@ -1877,6 +2548,40 @@ class Datasource:
             results["data"] = dict_welldeviations
             return alanaResults.ResultsParser(results)
         
+    def getWellDeviations(self, well_names: list, int_workers: int = 8):
+        """
+        {
+            "description": "Batch variant of getWellDeviation, fetches the surveys of many wells in parallel and returns them in one frame with a well_name column",
+            "arguments":{
+                "well_names": ["Well_A", "Well_B"],
+                "int_workers": 8
+            },
+            "return": "ResultsParser, .df with the getWellDeviation columns plus well_name, sorted by well_name and md"
+        }
+        """
+        def _fetch(well_name):
+            params = {"wellmaster_fk": self.master.wellmasterdict[well_name]}
+            return well_name, self.master._getMaster("datasource", "welldeviation", params=params)
+
+        list_frames = []
+        with ThreadPoolExecutor(max_workers=int_workers) as executor:
+            futures = [executor.submit(_fetch, well_name) for well_name in well_names]
+            for future in as_completed(futures):
+                try:
+                    well_name, list_surveys = future.result()
+                except Exception as err:
+                    print(f"Deviation request failed: {err}")
+                    continue
+                df_well = pd.DataFrame(list_surveys)
+                df_well["well_name"] = well_name
+                list_frames.append(df_well)
+        df_deviations = pd.concat(list_frames, ignore_index=True) if list_frames else pd.DataFrame()
+        if "md" in df_deviations.columns:
+            df_deviations = df_deviations.sort_values(["well_name", "md"]).reset_index(drop=True)
+        results = {}
+        results["data"] = df_deviations.to_dict(orient="records")
+        return alanaResults.ResultsParser(results)
+
     def getWellIntervention(self, str_well_name = None):
         """
         {
@@ -2059,6 +2764,76 @@ class Datasource:
         else:
             return alanaResults.ProdResultsParser(results)
     
+    def getMonthlyProductionBulk(self, well_names: list, int_chunk_size: int = 200, int_workers: int = 4,
+                                 bool_errors: bool = False):
+        """
+        Fetches monthly production for many wells with a handful of chunked requests.
+
+        Well names are split in chunks of int_chunk_size, each chunk is one getMonthlyProduction request and the
+        chunks are fetched in parallel. The result stays columnar, one row per well and month. Names missing from
+        wellmasterdict are not requested. A chunk fails on a non-2xx status or a response without a data payload,
+        its wells are then fetched again one by one so a single bad well does not lose the others.
+
+        Parameters:
+        - well_names (list): Well names to fetch.
+        - int_chunk_size (int): Wells per request. Defaults to 200.
+        - int_workers (int): Parallel requests. Defaults to 4.
+        - bool_errors (bool): Also return the wells that could not be fetched. Defaults to False.
+
+        Returns:
+        - pandas.DataFrame with the getMonthlyProduction columns (well_name, date, oil_rate, ...), sorted by well_name and date.
+        - With bool_errors, (DataFrame, {well_name: error}).
+        """
+        dict_errors = {well_name: f"Unknown well name: {well_name}" for well_name in well_names
+                       if well_name not in self.master.wellmasterdict}
+        list_valid = [well_name for well_name in well_names if well_name not in dict_errors]
+        list_chunks = [list_valid[i:i + int_chunk_size] for i in range(0, len(list_valid), int_chunk_size)]
+        list_frames = []
+
+        def _request_chunk(list_chunk):
+            # getMonthlyProduction swallows server errors into an empty parser, check the response here instead
+            mydata = self.master._requestWithRetry(
+                "get", self.master.root_url + "/api/datasource/wellmonthly/",
+                headers={'Authorization': 'Token ' + self.master.credentials["alana_token"],
+                         "content-type": "application/json"},
+                params={"well_fk": None, "should_return_extra_field": True,
+                        "wells_fks[]": [self.master.wellmasterdict[x] for x in list_chunk]})
+            if mydata is None or not 200 <= mydata.status_code < 300:
+                raise ValueError(f"{getattr(mydata, 'status_code', None)}: {getattr(mydata, 'text', '')[:200]}")
+            payload = mydata.json()
+            if not isinstance(payload, dict) or not isinstance(payload.get("data"), list):
+                raise ValueError(f"Response without a data payload: {str(payload)[:200]}")
+            if not payload["data"]:
+                return pd.DataFrame(columns=["well_name", "date", "oil_rate"])
+            return alanaResults.ProdResultsParser({"data": Generic().fkChanger(payload["data"])}).df
+
+        def _fetch_chunk(list_chunk):
+            try:
+                return [_request_chunk(list_chunk)], {}
+            except Exception as err:
+                if len(list_chunk) == 1:
+                    return [], {list_chunk[0]: f"{type(err).__name__}: {err}"}
+            list_chunk_frames, dict_chunk_errors = [], {}
+            for well_name in list_chunk:
+                list_well_frames, dict_well_errors = _fetch_chunk([well_name])
+                list_chunk_frames += list_well_frames
+                dict_chunk_errors.update(dict_well_errors)
+            return list_chunk_frames, dict_chunk_errors
+
+        with ThreadPoolExecutor(max_workers=int_workers) as executor:
+            for list_chunk_frames, dict_chunk_errors in executor.map(_fetch_chunk, list_chunks):
+                list_frames += list_chunk_frames
+                dict_errors.update(dict_chunk_errors)
+        if dict_errors:
+            print(f"Production not fetched for {len(dict_errors)} wells: {list(dict_errors)[:20]}")
+        list_frames = [df for df in list_frames if {"well_name", "date"}.issubset(df.columns)]
+        if not list_frames:
+            df_production = pd.DataFrame(columns=["well_name", "date", "oil_rate"])
+        else:
+            df_production = pd.concat(list_frames, ignore_index=True)
+            df_production = df_production.sort_values(["well_name", "date"]).reset_index(drop=True)
+        return (df_production, dict_errors) if bool_errors else df_production
+
     def getDailyProduction(self, well_name: str):
         """
         {
@@ -2102,38 +2877,210 @@ class Datasource:
         monthly_volume = self.master._getCase("datasource","fieldmonthly","fields[]", field_names)
         return monthly_volume
         
-    def importDataSource(self, tablename, df_table, is_new_data=False):
+    def importDataSource(self, tablename, df_table, is_new_data=False, int_chunk_rows=100000, compression=None,
+                         int_workers=4, int_retries=3):
         """
         {
-            "description": "Function that uploads a csv with data",
+            "description": "Function that uploads a DataFrame as csv. The csv is encoded in memory (no temporary files), one chunk of int_chunk_rows at a time, and tables larger than int_chunk_rows are uploaded in parallel chunks (int_chunk_rows=None sends a single request). The first chunk carries is_new_data, the rest are appended. Appends are only resent when their connection could not be opened: a chunk answered with a 5xx or a timeout may have been stored, it is reported in failed_chunks and not retried",
             "arguments" : {
                 "dict_main" : {
                     "tablename": "wellmaster",
                     "df_table": "df_table",
-                    "is_new_date": "True"
+                    "is_new_date": "True",
+                    "int_chunk_rows": 100000,
+                    "compression": "None | gzip | bz2 | zip | xz",
+                    "int_workers": 4,
+                    "int_retries": 3
                 }
             },
             "return":{
                 "keys":"items"
+            },
+            "return_chunked":{
+                "chunks": 3,
+                "responses": [{"keys":"items"}],
+                "failed_chunks": []
             }
         }
         """
-        #test_file = open("/Users/alejandroprimeranavarro/Alana/jupyter_samples/DCA_Summary_sampledata.csv", "rb")
-        df_table.to_csv("importDataSource_temp.csv", index=False)
-        file = open("importDataSource_temp.csv", "rb")
         url = self.master.root_url +"/api/datasource/dataloader/import/"
         header = {'Authorization': 'Token ' + self.master.credentials["alana_token"]}
+        if not int_chunk_rows or len(df_table) <= int_chunk_rows:
+            mydata = self._uploadDataSourceChunk(url, header, tablename, df_table, is_new_data, compression,
+                                                 int_retries)
+            print(mydata)
+            return mydata.json()
+
+        list_chunks = [df_table.iloc[i:i + int_chunk_rows] for i in range(0, len(df_table), int_chunk_rows)]
+        responses = [None] * len(list_chunks)
+        failed_chunks = []
+        # The first chunk goes alone so a replace (is_new_data) lands before any append
+        mydata = self._uploadDataSourceChunk(url, header, tablename, list_chunks[0], is_new_data, compression,
+                                             int_retries)
+        if mydata.status_code >= 300:
+            print(f"Chunk 0 failed with status {mydata.status_code}, aborting import")
+            return {"chunks": len(list_chunks), "responses": [mydata.json()], "failed_chunks": list(range(len(list_chunks)))}
+        responses[0] = mydata.json()
+        with ThreadPoolExecutor(max_workers=int_workers) as executor:
+            futures = {executor.submit(self._uploadDataSourceChunk, url, header, tablename, chunk, False,
+                                       compression, int_retries): n
+                       for n, chunk in enumerate(list_chunks) if n > 0}
+            for future in as_completed(futures):
+                n = futures[future]
+                try:
+                    mydata = future.result()
+                    responses[n] = mydata.json()
+                    if mydata.status_code >= 300:
+                        failed_chunks.append(n)
+                except Exception as err:
+                    print(f"Chunk {n} failed: {err}")
+                    failed_chunks.append(n)
+        print(f"Uploaded {len(list_chunks) - len(failed_chunks)}/{len(list_chunks)} chunks")
+        return {"chunks": len(list_chunks), "responses": responses, "failed_chunks": sorted(failed_chunks)}
+
+    def _uploadDataSourceChunk(self, url, header, tablename, df_chunk, is_new_data, compression, int_retries):
+        dict_extensions = {None: "", "gzip": ".gz", "bz2": ".bz2", "zip": ".zip", "xz": ".xz"}
+        buffer = io.BytesIO()
+        df_chunk.to_csv(buffer, index=False, compression=compression)
+        filename = "importDataSource.csv" + dict_extensions[compression]
         data = {
-            #"file_uploaded": file,
             "tablename": tablename,
             "is_new_data": is_new_data
         }
-        print("uploaded:", {"file_uploaded": file})
-        mydata = requests.post(url, headers=header, files={"file_uploaded": file}, data=data)
-        print(mydata)
-        file.close()
-        os.remove("importDataSource_temp.csv")
-        return mydata.json()
+        # bytes (not the buffer) so every retry re-sends the full body
+        files = {"file_uploaded": (filename, buffer.getvalue(), "text/csv")}
+        # A replace can be repeated safely, an append the server already applied would duplicate rows
+        request = self.master._requestWithRetry if is_new_data else self.master._requestNoResend
+        return request("post", url, int_retries=int_retries, headers=header, files=files, data=data)
+
+
+    def bulkImportDataSource(self, tablename, data, str_checkpoint_path=None, int_partition_rows=50000,
+                             is_new_data=False, case_app=None, case_table=None, compression=None, int_retries=3,
+                             str_uncertain=None):
+        """
+        {
+            "description": "Resumable bulk load of a DataFrame or csv file of arbitrary size. Rows are split in partitions uploaded in order, every partition acknowledged by the server is recorded in a local checkpoint file and a rerun after a crash or timeout resumes after the last good partition. By default partitions go through importDataSource, with case_app and case_table they are posted as records through _createCases. Appends are not idempotent: a partition answered with a 5xx or a timeout may have been stored, it is recorded as uncertain_partition and a rerun refuses to continue until str_uncertain says whether to resend or skip it",
+            "arguments" : {
+                "tablename": "wellmonthly",
+                "data": "df_table | path/to/file.csv",
+                "str_checkpoint_path": "None -> <file>.checkpoint.json or bulkImport_<tablename>_<content hash>.checkpoint.json",
+                "int_partition_rows": 50000,
+                "is_new_data": "False, only applied to the first partition",
+                "case_app": "None | economics",
+                "case_table": "None | economicforecastcase",
+                "compression": "None | gzip",
+                "int_retries": 3,
+                "str_uncertain": "None | resend | skip, what a rerun does with the uncertain partition once checked on the server"
+            },
+            "return":{
+                "partitions": 10,
+                "acked_partitions": [0, 1, 2],
+                "failed_partition": "None | 3",
+                "uncertain_partition": "None | 3, failed_partition when the server may have stored it",
+                "checkpoint": "path"
+            }
+        }
+        """
+        mygeneric = Generic()
+        if isinstance(data, pd.DataFrame):
+            str_content = self._frameFingerprint(data)
+            dict_source = {"type": "dataframe", "rows": len(data), "columns": [str(x) for x in data.columns],
+                           "content": str_content}
+            iter_partitions = (data.iloc[i:i + int_partition_rows] for i in range(0, len(data), int_partition_rows))
+            # Keyed on the content so concurrent imports of different frames never share a checkpoint
+            default_checkpoint = f"bulkImport_{tablename}_{str_content[:16]}.checkpoint.json"
+        else:
+            dict_source = {"type": "file", "path": os.path.abspath(data), "size": os.path.getsize(data),
+                           "mtime": os.path.getmtime(data)}
+            iter_partitions = pd.read_csv(data, chunksize=int_partition_rows)
+            default_checkpoint = f"{data}.checkpoint.json"
+        str_checkpoint_path = str_checkpoint_path or default_checkpoint
+        dict_job = {"tablename": tablename, "case_app": case_app, "case_table": case_table,
+                    "int_partition_rows": int_partition_rows, "source": dict_source}
+
+        dict_checkpoint = {"job": dict_job, "acked_partitions": []}
+        if os.path.exists(str_checkpoint_path):
+            with open(str_checkpoint_path, "r") as checkpoint_file:
+                dict_checkpoint = json.load(checkpoint_file)
+            if dict_checkpoint["job"] != dict_job:
+                raise ValueError(f"Checkpoint {str_checkpoint_path} belongs to a different import, remove it to start over")
+            print(f"Resuming import, {len(dict_checkpoint['acked_partitions'])} partitions already loaded")
+        set_acked = set(dict_checkpoint["acked_partitions"])
+        uncertain_partition = dict_checkpoint.get("uncertain_partition")
+        if uncertain_partition is not None:
+            if str_uncertain not in ("resend", "skip"):
+                raise ValueError(f"Partition {uncertain_partition} may already be stored (the server answered 5xx or "
+                                 f"timed out). Check the table, then rerun with str_uncertain='resend' or 'skip'")
+            if str_uncertain == "skip":
+                set_acked.add(uncertain_partition)
+            dict_checkpoint["uncertain_partition"] = uncertain_partition = None
+
+        url = self.master.root_url + "/api/datasource/dataloader/import/"
+        header = {'Authorization': 'Token ' + self.master.credentials["alana_token"]}
+        int_partitions = 0
+        failed_partition = None
+        for n, df_partition in enumerate(iter_partitions):
+            int_partitions += 1
+            if n in set_acked:
+                continue
+            try:
+                if case_app and case_table:
+                    list_of_dicts = mygeneric.dataFrameToRecords(df_partition)
+                    mydata = self.master._postCases(list_of_dicts, case_app, case_table, int_retries=int_retries)
+                else:
+                    mydata = self._uploadDataSourceChunk(url, header, tablename, df_partition,
+                                                         is_new_data and n == 0, compression, int_retries)
+                bool_status = 200 <= mydata.status_code < 300
+                bool_uncertain = mydata.status_code >= 500
+            except requests.exceptions.RequestException as err:
+                print(f"Partition {n} failed: {err}")
+                bool_status, bool_uncertain = False, not self.master._isUnsentError(err)
+            if not bool_status:
+                failed_partition = n
+                if bool_uncertain:
+                    uncertain_partition = n
+                    dict_checkpoint["uncertain_partition"] = n
+                    dict_checkpoint["acked_partitions"] = sorted(set_acked)
+                    self._writeCheckpoint(str_checkpoint_path, dict_checkpoint)
+                break
+            set_acked.add(n)
+            dict_checkpoint["acked_partitions"] = sorted(set_acked)
+            self._writeCheckpoint(str_checkpoint_path, dict_checkpoint)
+
+        if failed_partition is None:
+            if os.path.exists(str_checkpoint_path):
+                os.remove(str_checkpoint_path)
+            print(f"Bulk import finished, {int_partitions} partitions loaded")
+        elif uncertain_partition is not None:
+            print(f"Bulk import stopped at partition {failed_partition}, the server may have stored it. Check the "
+                  f"table and rerun with str_uncertain='resend' or 'skip' to resume from {str_checkpoint_path}")
+        else:
+            print(f"Bulk import stopped at partition {failed_partition}, rerun to resume from {str_checkpoint_path}")
+        return {"partitions": int_partitions, "acked_partitions": sorted(set_acked),
+                "failed_partition": failed_partition, "uncertain_partition": uncertain_partition,
+                "checkpoint": str_checkpoint_path}
+
+    @staticmethod
+    def _frameFingerprint(df):
+        """
+        Internal Function
+        Order-sensitive sha256 of the values, index, column names and dtypes of a DataFrame
+        """
+        try:
+            row_hashes = pd.util.hash_pandas_object(df, index=True)
+        except TypeError:
+            # Unhashable cell values (lists, dicts) are hashed through their text
+            row_hashes = pd.util.hash_pandas_object(df.astype(str), index=True)
+        myhash = hashlib.sha256(row_hashes.to_numpy().tobytes())
+        myhash.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+        return myhash.hexdigest()
+
+    def _writeCheckpoint(self, str_checkpoint_path, dict_checkpoint):
+        # Write then rename so a crash never leaves a truncated checkpoint behind
+        str_temp_path = str_checkpoint_path + ".tmp"
+        with open(str_temp_path, "w") as checkpoint_file:
+            json.dump(dict_checkpoint, checkpoint_file)
+        os.replace(str_temp_path, str_checkpoint_path)
 
 
 class Generic:
@@ -2149,10 +3096,202 @@ class Generic:
             dates = dates[-months:]
             rates = rates[-months:]
         if delete_zeros == 'YES':
-            zero_indices = np.where(np.array(rates) != 0.0)
-            dates = list(np.array(dates)[list(zero_indices[0])])
-            rates = list(np.array(rates)[list(zero_indices[0])])
-        return dates, rates
+            keep = np.asarray(rates, dtype=float) != 0.0
+            dates = [x for x, is_kept in zip(dates, keep) if is_kept]
+            rates = [x for x, is_kept in zip(rates, keep) if is_kept]
+        return list(dates), list(rates)
+
+    def flagProductionAnomalies(self, df, int_window=7, float_threshold=3.5, float_downtime_ratio=0.5,
+                                str_well_col="well_name", str_date_col="date", str_rate_col="oil_rate",
+                                str_days_col=None, float_min_uptime=0.8, float_min_scale=0.02):
+        """
+        {
+        "description": "Vectorized shut-in, downtime and outlier flags for every well at once. Each point is compared with the centred rolling median of the log rates of its own well (int_window points, shut-ins excluded): points below float_downtime_ratio times the median are downtime, points further than float_threshold robust deviations (1.4826 MAD of the well's deviations) from it are outliers. With str_days_col (days on production), months under float_min_uptime of the month are downtime too",
+        "arguments" : {
+            "df": "DataFrame[well_name, date, oil_rate], e.g. getMonthlyProductionBulk",
+            "int_window": 7,
+            "float_threshold": 3.5,
+            "float_downtime_ratio": 0.5,
+            "str_days_col": "None | days_on",
+            "float_min_uptime": 0.8,
+            "float_min_scale": "0.02, floor of the robust deviation (log rate) so smooth histories are not over-flagged"
+            },
+        "return": "DataFrame sorted by well and date with the input columns plus is_shut_in, is_downtime, is_outlier and is_valid",
+        "example": "mygeneric.flagProductionAnomalies(mydatasource.getMonthlyProductionBulk(well_names))"
+        }
+        """
+        df1 = df.copy()
+        df1[str_date_col] = pd.to_datetime(df1[str_date_col])
+        df1 = df1.sort_values([str_well_col, str_date_col], kind="stable").reset_index(drop=True)
+        rates = pd.to_numeric(df1[str_rate_col], errors="coerce").to_numpy(dtype=float)
+        is_shut_in = ~(rates > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_q = np.where(is_shut_in, np.nan, np.log(rates))
+        well_codes = pd.factorize(df1[str_well_col])[0]
+        # Centred windows over the concatenated wells; neighbours from another well are masked out
+        int_half = max(int(int_window) // 2, 1)
+        padded_q = np.pad(log_q, int_half, constant_values=np.nan)
+        padded_well = np.pad(well_codes, int_half, constant_values=-1)
+        windows = np.lib.stride_tricks.sliding_window_view(padded_q, 2 * int_half + 1)
+        same_well = np.lib.stride_tricks.sliding_window_view(padded_well, 2 * int_half + 1) == well_codes[:, None]
+        windows = np.where(same_well, windows, np.nan)
+        # The point itself is left out of its reference median so a spike cannot pull it
+        windows[:, int_half] = np.nan
+        # Neighbours are moved along the local trend (median point-to-point log change over twice the window),
+        # otherwise steep early declines and one-sided windows at the ends of the history read as anomalies
+        int_slope_half = 2 * int_half
+        step = np.append(np.where(well_codes[1:] == well_codes[:-1], np.diff(log_q), np.nan), np.nan)
+        step_windows = np.lib.stride_tricks.sliding_window_view(
+            np.pad(step, int_slope_half, constant_values=np.nan), 2 * int_slope_half + 1)[:, :-1]
+        step_wells = np.lib.stride_tricks.sliding_window_view(
+            np.pad(well_codes, int_slope_half, constant_values=-1), 2 * int_slope_half + 1)
+        step_windows = np.where((step_wells[:, :-1] == well_codes[:, None]) & (step_wells[:, 1:] == well_codes[:, None]),
+                                step_windows, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            slope = np.nan_to_num(np.nanmedian(step_windows, axis=1))
+        windows = windows - slope[:, None] * np.arange(-int_half, int_half + 1)[None, :]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            median = np.nanmedian(windows, axis=1)
+        deviation = log_q - median
+        # One robust scale per well, a handful of window points is too few for a stable MAD
+        mad = 1.4826 * pd.Series(np.abs(deviation)).groupby(well_codes).transform("median").to_numpy()
+        is_downtime = ~is_shut_in & (deviation < np.log(float_downtime_ratio))
+        if str_days_col is not None:
+            days_in_month = df1[str_date_col].dt.days_in_month.to_numpy()
+            uptime = pd.to_numeric(df1[str_days_col], errors="coerce").to_numpy(dtype=float) / days_in_month
+            is_downtime |= ~is_shut_in & (uptime < float_min_uptime)
+        # A median of fewer neighbours (ends of the history, shut-ins around) is noisier, the threshold widens with it
+        n_neighbours = np.maximum((~np.isnan(windows)).sum(axis=1), 1)
+        widening = np.sqrt((1.0 + np.pi / (2 * n_neighbours)) / (1.0 + np.pi / (4 * int_half)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            is_outlier = ~is_shut_in & ~is_downtime & \
+                (np.abs(deviation) > float_threshold * widening * np.maximum(mad, float_min_scale))
+        df1["is_shut_in"] = is_shut_in
+        df1["is_downtime"] = is_downtime
+        df1["is_outlier"] = is_outlier
+        df1["is_valid"] = ~(is_shut_in | is_downtime | is_outlier)
+        return df1
+
+    def preprocessProductionData(self, df, int_window, int_zero_window, delete_zeros=True, str_well_col="well_name",
+                                 str_date_col="date", str_rate_col="oil_rate", dict_anomalies=None):
+        """
+        {
+        "description": "Columnar DCA preprocessing of all wells at once: dates parsed to datetime64, the last int_window rows of each well kept, zero rates removed, and each well checked for at least two points to fit and for production in its last int_zero_window rows. Same rules as filterProductionData, without per-well loops",
+        "arguments" : {
+            "df": "DataFrame[well_name, date, oil_rate], e.g. getMonthlyProductionBulk",
+            "int_window": 60,
+            "int_zero_window": 6,
+            "delete_zeros": true,
+            "dict_anomalies": "None | flagProductionAnomalies arguments; flagged points are left out of the fit window"
+            },
+        "return": {
+            "df_selected": "DataFrame[well_name, date, oil_rate] with the fit window of every well, sorted by well and date",
+            "df_wells": "DataFrame[well_name, n_rows, n_selected, n_flagged, last_rate, recent_production, status ('ok' | 'nofit' | 'noprod')]"
+            },
+        "example": "df_selected, df_wells = mygeneric.preprocessProductionData(df_production, 60, 6)"
+        }
+        """
+        df1 = pd.DataFrame({
+            str_well_col: df[str_well_col].to_numpy(),
+            str_date_col: pd.to_datetime(df[str_date_col]),
+            str_rate_col: pd.to_numeric(df[str_rate_col], errors="coerce").fillna(0.0).to_numpy(dtype=float),
+        })
+        df1 = df1.sort_values([str_well_col, str_date_col], kind="stable").reset_index(drop=True)
+        position_from_end = df1.groupby(str_well_col, sort=False).cumcount(ascending=False).to_numpy()
+        rates = df1[str_rate_col].to_numpy()
+        is_selected = position_from_end < int_window
+        if delete_zeros:
+            is_selected &= rates != 0.0
+        is_flagged = np.zeros(len(df1), dtype=bool)
+        if dict_anomalies is not None:
+            df_flags = self.flagProductionAnomalies(df1, str_well_col=str_well_col, str_date_col=str_date_col,
+                                                    str_rate_col=str_rate_col, **dict_anomalies)
+            # Shut-ins are already handled by delete_zeros, only downtime and outliers are removed here
+            is_flagged = (df_flags["is_downtime"] | df_flags["is_outlier"]).to_numpy()
+            is_selected &= ~is_flagged
+        df_wells = pd.DataFrame({
+            str_well_col: df1[str_well_col],
+            "n_rows": 1,
+            "n_selected": is_selected.astype(int),
+            "n_flagged": (is_flagged & (position_from_end < int_window)).astype(int),
+            "last_rate": rates,
+            "recent_production": np.where(position_from_end < int_zero_window, rates, 0.0),
+        }).groupby(str_well_col, sort=False).agg(n_rows=("n_rows", "sum"), n_selected=("n_selected", "sum"),
+                                                 n_flagged=("n_flagged", "sum"), last_rate=("last_rate", "last"),
+                                                 recent_production=("recent_production", "sum")).reset_index()
+        df_wells["status"] = np.where(df_wells["n_selected"] <= 1, "nofit",
+                                      np.where(df_wells["recent_production"] <= 0, "noprod", "ok"))
+        return df1[is_selected].reset_index(drop=True), df_wells
+
+    def dataFrameToRecords(self, df):
+        """
+        {
+        "description": "Function that converts a DataFrame in a list of json-ready dicts, dates as YYYY-MM-DD and NaN/NaT as None",
+        "arguments" : { df },
+        "example": "mygeneric.dataFrameToRecords(df)"
+        }
+        """
+        return self.cleanNaNNaT(df).to_dict(orient="records")
+
+    def dataFrameToJsonRecords(self, df):
+        """
+        {
+        "description": "Function that serialises every row of a DataFrame to a json object string in one vectorized pass, dates as YYYY-MM-DD and NaN/NaT as null, for uploads that must not build a dict per row",
+        "arguments" : { df },
+        "example": "mygeneric.dataFrameToJsonRecords(df)"
+        }
+        """
+        df1, _ = self._formatDateColumns(df.reset_index(drop=True))
+        if len(df1) == 0:
+            return []
+        str_json = df1.to_json(orient="records", lines=True, double_precision=15, date_unit="s")
+        return str_json.rstrip("\n").split("\n")
+
+    def minimumCurvature(self, df, str_md_col="md", str_inc_col="inc", str_azi_col="azi", str_well_col="well_name",
+                         float_dls_interval=30.0):
+        """
+        {
+        "description": "Vectorized minimum-curvature trajectory for all wells of a survey frame at once (e.g. getWellDeviations().df). Recomputes tvd, dispNs, dispEw and dls (degrees per float_dls_interval of md) from md/inclination/azimuth in degrees. Each well is tied in at surface (md 0, vertical)",
+        "arguments" : {
+            "df": "DataFrame[well_name, md, inc, azi]",
+            "str_md_col": "md",
+            "str_inc_col": "inc",
+            "str_azi_col": "azi",
+            "str_well_col": "well_name",
+            "float_dls_interval": 30.0
+            },
+        "example": "mygeneric.minimumCurvature(mydatasource.getWellDeviations(['Well_A', 'Well_B']).df)"
+        }
+        """
+        df1 = df.sort_values([str_well_col, str_md_col]).reset_index(drop=True)
+        md = df1[str_md_col].to_numpy(dtype=float)
+        inc = np.radians(df1[str_inc_col].to_numpy(dtype=float))
+        azi = np.radians(df1[str_azi_col].to_numpy(dtype=float))
+        # Previous station, replaced by the surface tie-in on the first row of every well
+        is_first = (df1[str_well_col] != df1[str_well_col].shift()).to_numpy()
+        md_prev = np.where(is_first, 0.0, np.roll(md, 1))
+        inc_prev = np.where(is_first, 0.0, np.roll(inc, 1))
+        azi_prev = np.where(is_first, 0.0, np.roll(azi, 1))
+
+        delta_md = md - md_prev
+        cos_dogleg = np.cos(inc - inc_prev) - np.sin(inc_prev) * np.sin(inc) * (1.0 - np.cos(azi - azi_prev))
+        dogleg = np.arccos(np.clip(cos_dogleg, -1.0, 1.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio_factor = np.where(dogleg > 1e-9, 2.0 / dogleg * np.tan(dogleg / 2.0), 1.0)
+            dls = np.where(delta_md > 0, np.degrees(dogleg) * float_dls_interval / delta_md, 0.0)
+        half_md = delta_md / 2.0 * ratio_factor
+        df1["delta_tvd"] = half_md * (np.cos(inc_prev) + np.cos(inc))
+        df1["delta_ns"] = half_md * (np.sin(inc_prev) * np.cos(azi_prev) + np.sin(inc) * np.cos(azi))
+        df1["delta_ew"] = half_md * (np.sin(inc_prev) * np.sin(azi_prev) + np.sin(inc) * np.sin(azi))
+        cumulative = df1.groupby(str_well_col, sort=False)[["delta_tvd", "delta_ns", "delta_ew"]].cumsum()
+        df1["tvd"] = cumulative["delta_tvd"].to_numpy()
+        df1["dispNs"] = cumulative["delta_ns"].to_numpy()
+        df1["dispEw"] = cumulative["delta_ew"].to_numpy()
+        df1["dls"] = dls
+        df1.drop(columns=["delta_tvd", "delta_ns", "delta_ew"], inplace=True)
+        return df1
 
     def statusCodeCheck(self,response):
         status_messages = {
@@ -2238,39 +3377,48 @@ class Generic:
                 return key
         return "key doesn't exist in dictionary"
 
-    def cleanNaNNaT(self,df):
+    def cleanNaNNaT(self, df):
         """
         {
-        "description": "Function that cleans NaN and NaT in a given DataFrame",
+        "description": "Function that cleans NaN and NaT in a given DataFrame: every date column (datetime dtypes and object columns holding dates) becomes YYYY-MM-DD strings and missing values become None, column-wise with masks",
         "arguments" : { df }
         "example": "myapi.cleanNaNNaT(df)"
         }
         """
-        df1 = df.replace(np.nan, None)
-        df1.replace({pd.NaT: None},inplace=True)
-        new_dates = []
-        for index, row in df1.iterrows():
-            if row["start_date"] is None :
-                new_dates.append(None)
-            else :
-                new_dates.append(row["start_date"].strftime('%Y-%m-%d'))
-        df1["start_date"] = new_dates
-        new_dates = []
-        for index, row in df1.iterrows():
-            if row["end_date"] is None :
-                new_dates.append(None)
-            else :
-                new_dates.append(row["end_date"].strftime('%Y-%m-%d'))
-        df1["end_date"] = new_dates
-        new_dates = []
-        for index, row in df1.iterrows():
-            if row["start_production_date"] is None :
-                new_dates.append(None)
-            else :
-                new_dates.append(row["start_production_date"].strftime('%Y-%m-%d'))
-        df1["start_production_date"] = new_dates
+        df1, list_date_cols = self._formatDateColumns(df)
+        for col in df1.columns.difference(list_date_cols, sort=False):
+            is_missing = df1[col].isna().to_numpy()
+            if is_missing.any():
+                values = df1[col].to_numpy(dtype=object, copy=True)
+                values[is_missing] = None
+                df1[col] = pd.Series(values, index=df1.index, dtype=object)
         return df1
 
+    def _formatDateColumns(self, df):
+        """
+        Internal Function
+        Copy of df with every date column as YYYY-MM-DD strings (None where missing), and those columns
+        """
+        df1 = df.copy()
+        list_date_cols = []
+        for col in df1.columns:
+            values = df1[col]
+            if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+                if pd.api.types.infer_dtype(values, skipna=True) not in ("datetime", "datetime64", "date"):
+                    continue
+                values = pd.to_datetime(values, errors="coerce", utc=False)
+            elif not pd.api.types.is_datetime64_any_dtype(values):
+                continue
+            if isinstance(values.dtype, pd.DatetimeTZDtype):
+                values = values.dt.tz_localize(None)
+            # Each distinct day is formatted once, NaT has code -1
+            codes, days = pd.factorize(values.to_numpy().astype("datetime64[D]"))
+            dates = np.append(np.datetime_as_string(np.asarray(days, dtype="datetime64[D]"), unit="D").astype(object),
+                              None)[codes]
+            df1[col] = pd.Series(dates, index=df1.index, dtype=object)
+            list_date_cols.append(col)
+        return df1, list_date_cols
+
     def fkChanger(self,dict_input):
         """
         Function that replaces and deletes the fk column with its equivalency.
@@ -2298,26 +3446,449 @@ class Generic:
         return df_dict.to_dict(orient="records")
 
 
-class DCA:
-    def __init__(self):
-        self.master = Singleton().master
-        self.datasource = "dca"
-        self.master_name = "dcamaster"
-        self.DCATemplate = self._getDCATemplate()
-        self.master.dcamasterdict = self.master._getGenericDict("dcamaster")
+class ResultCache:
+    """
+    Two-tier memoization store: an in-memory LRU of int_max_items entries in front of an optional on-disk tier
+    (one json file per key under str_cache_dir). Values must be json serialisable; they are stored serialised,
+    so every get() returns a fresh copy that callers are free to mutate.
+    """
 
-    def _getDCATemplate(self):
-        url = self.master.root_url + "/api/dca/forecast/"
-        header = self.master.header
-        mydata = requests.get(url, headers=header)
-        return mydata.json()
-        
-    def createDCAMaster(self, dca_master_dict):
-        """
-        {
-            "description": "Function that creates master for DCA Data",
-            "arguments" : {
-                "dict_main":{
+    def __init__(self, int_max_items: int = 2048, str_cache_dir: Optional[str] = None):
+        self.int_max_items = int_max_items
+        self.str_cache_dir = str_cache_dir
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if str_cache_dir:
+            os.makedirs(str_cache_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(obj):
+        return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.str_cache_dir, key + ".json")
+
+    def get(self, key):
+        with self._lock:
+            str_value = self._memory.get(key)
+            if str_value is not None:
+                self._memory.move_to_end(key)
+        if str_value is None and self.str_cache_dir and os.path.exists(self._path(key)):
+            with open(self._path(key), "r") as cache_file:
+                str_value = cache_file.read()
+            self._remember(key, str_value)
+        with self._lock:
+            if str_value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(str_value)
+
+    def set(self, key, value):
+        str_value = json.dumps(value, default=str)
+        self._remember(key, str_value)
+        if self.str_cache_dir:
+            str_temp_path = self._path(key) + f".{threading.get_ident()}.tmp"
+            with open(str_temp_path, "w") as cache_file:
+                cache_file.write(str_value)
+            os.replace(str_temp_path, self._path(key))
+
+    def _remember(self, key, str_value):
+        with self._lock:
+            self._memory[key] = str_value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.int_max_items:
+                self._memory.popitem(last=False)
+
+    def clear(self, bool_disk: bool = False):
+        with self._lock:
+            self._memory.clear()
+        if bool_disk and self.str_cache_dir:
+            for str_name in os.listdir(self.str_cache_dir):
+                if str_name.endswith(".json"):
+                    os.remove(os.path.join(self.str_cache_dir, str_name))
+
+
+class AlanaJob:
+    """
+    Handle of one server computation submitted through a JobPool.
+
+    status moves from pending to running to done or error. If the server answers 202 Accepted with a status
+    location (Location header, or status_url in the body) the job polls it with exponential backoff
+    instead of holding the connection for the whole run. Submissions start server runs, so they are only
+    retried when the connection could not be opened; a 5xx or 429 answer fails the job instead of resending it. future is the underlying concurrent.futures.Future,
+    so a job can also be awaited with asyncio.wrap_future(job.future).
+    """
+    PENDING_STATES = ("PENDING", "QUEUED", "STARTED", "RUNNING", "PROGRESS", "RETRY")
+    FAILED_STATES = ("FAILURE", "FAILED", "ERROR", "REVOKED")
+
+    def __init__(self, str_name, method, url, dict_request):
+        self.name = str_name
+        self.method = method
+        self.url = url
+        self.dict_request = dict_request
+        self.status = "pending"
+        self.status_url = None
+        self.result_data = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.future = None
+
+    def __repr__(self):
+        return f"AlanaJob({self.name!r}, status={self.status!r})"
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        Block until the job is finished (or timeout seconds) and return it, whatever its status.
+        """
+        try:
+            self.future.result(timeout=timeout)
+        except Exception:
+            pass
+        return self
+
+    def result(self, timeout: Optional[float] = None):
+        """
+        Block until the job is finished and return the server results, raising RuntimeError if the job failed.
+        """
+        self.wait(timeout)
+        if self.status == "error":
+            raise RuntimeError(f"Job {self.name} failed: {self.error}")
+        return self.result_data
+
+    def _run(self, master, float_poll_interval, float_max_interval, float_timeout, int_retries):
+        self.status = "running"
+        try:
+            response = self._submit(master, int_retries)
+            body = self._json(response)
+            self.status_url = self._statusUrl(master, response, body)
+            float_wait = float_poll_interval
+            while response.status_code == 202 or (self.status_url and self._state(body) in self.PENDING_STATES):
+                if self.status_url is None:
+                    raise RuntimeError("Server accepted the job without a status location")
+                if float_timeout is not None and time.time() - self.submitted_at > float_timeout:
+                    raise TimeoutError(f"Job still running after {float_timeout} s")
+                time.sleep(float_wait)
+                float_wait = min(float_wait * 2, float_max_interval)
+                response = master._requestWithRetry("get", self.status_url, int_retries=int_retries,
+                                                    headers=self.dict_request.get("headers"))
+                body = self._json(response)
+            if response.status_code >= 400 or self._state(body) in self.FAILED_STATES:
+                raise RuntimeError(f"{response.status_code} {body}")
+            if isinstance(body, dict) and body.get("result_url"):
+                body = self._json(master._requestWithRetry("get", self._absolute(master, body["result_url"]),
+                                                           int_retries=int_retries,
+                                                           headers=self.dict_request.get("headers")))
+            elif self.status_url and isinstance(body, dict) and "result" in body:
+                body = body["result"]
+            self.result_data = body
+            self.status = "done"
+        except Exception as err:
+            self.error = str(err)
+            self.status = "error"
+        finally:
+            self.finished_at = time.time()
+        return self
+
+    def _submit(self, master, int_retries, float_backoff=1.0):
+        # Only errors raised before anything reached the server are safe to retry
+        return master._requestNoResend(self.method, self.url, int_retries=int_retries, float_backoff=float_backoff,
+                                       **self.dict_request)
+
+    @staticmethod
+    def _json(response):
+        try:
+            return response.json()
+        except ValueError:
+            return response.text
+
+    @staticmethod
+    def _state(body):
+        if isinstance(body, dict):
+            return str(body.get("status") or body.get("state") or "").upper()
+        return ""
+
+    @staticmethod
+    def _absolute(master, str_url):
+        return str_url if str_url.startswith("http") else master.root_url + str_url
+
+    def _statusUrl(self, master, response, body):
+        str_url = response.headers.get("Location") if response.status_code == 202 else None
+        if isinstance(body, dict):
+            str_url = str_url or body.get("status_url")
+        return self._absolute(master, str_url) if str_url else None
+
+
+class JobPool:
+    """
+    Runs AlanaJobs concurrently, at most int_max_concurrent at a time; further submissions wait their turn.
+    int_retries applies to status polling and to submissions whose connection could not be opened.
+    """
+
+    def __init__(self, int_max_concurrent: int = 8, float_poll_interval: float = 1.0, float_max_interval: float = 30.0,
+                 float_timeout: Optional[float] = None, int_retries: int = 2):
+        self.master = Singleton().master
+        self.int_max_concurrent = int_max_concurrent
+        self.float_poll_interval = float_poll_interval
+        self.float_max_interval = float_max_interval
+        self.float_timeout = float_timeout
+        self.int_retries = int_retries
+        self.executor = ThreadPoolExecutor(max_workers=int_max_concurrent)
+        self.jobs = []
+
+    def submit(self, str_name, method, endpoint, params=None, data=None):
+        """
+        Queue a request to root_url + endpoint and return its AlanaJob right away. data is sent as a json body.
+        """
+        header = {'Authorization': 'Token ' + self.master.credentials["alana_token"],
+                  "content-type": "application/json"}
+        dict_request = {"headers": header}
+        if params is not None:
+            dict_request["params"] = params
+        if data is not None:
+            dict_request["data"] = json.dumps(data, default=str)
+        job = AlanaJob(str_name, method, self.master.root_url + endpoint, dict_request)
+        job.future = self.executor.submit(job._run, self.master, self.float_poll_interval, self.float_max_interval,
+                                          self.float_timeout, self.int_retries)
+        self.jobs.append(job)
+        return job
+
+    def asCompleted(self, list_jobs: Optional[list] = None, timeout: Optional[float] = None):
+        """
+        Yield jobs (all the pool's by default) as they finish.
+        """
+        list_jobs = self.jobs if list_jobs is None else list_jobs
+        dict_futures = {job.future: job for job in list_jobs}
+        for future in as_completed(dict_futures, timeout=timeout):
+            yield dict_futures[future]
+
+    def gather(self, list_jobs: Optional[list] = None, timeout: Optional[float] = None):
+        """
+        Wait for the jobs and return {job name: results}; failed jobs are printed and left out.
+        """
+        list_jobs = self.jobs if list_jobs is None else list_jobs
+        dict_results = {}
+        for job in self.asCompleted(list_jobs, timeout):
+            if job.status == "done":
+                dict_results[job.name] = job.result_data
+            else:
+                print(f"Job {job.name} failed: {job.error}")
+        return dict_results
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+class DCACaseBatcher:
+    """
+    Write-behind batcher for dcacase payloads.
+
+    add() buffers one save dict per well and, once int_batch_size payloads or int_max_bytes of json are
+    buffered, sends them in one _createCases("dca", "dcacase") request through _createCasesBatched. flush()
+    sends what is left. Both return the per-well outcomes of what was sent; add() can be called from many
+    threads, every flush is performed by the thread that filled the batch.
+    """
+
+    def __init__(self, int_batch_size: int = 200, int_max_bytes: int = 5000000, int_retries: int = 2):
+        self.master = Singleton().master
+        self.int_batch_size = int_batch_size
+        self.int_max_bytes = int_max_bytes
+        self.int_retries = int_retries
+        self._buffer = []
+        self._int_bytes = 0
+        self._lock = threading.Lock()
+        self.outcomes = {}
+
+    def add(self, key, dca_save_dict: dict):
+        str_body = json.dumps(dca_save_dict)
+        with self._lock:
+            self._buffer.append((key, dca_save_dict))
+            self._int_bytes += len(str_body)
+            if len(self._buffer) < self.int_batch_size and self._int_bytes < self.int_max_bytes:
+                return []
+            list_batch, self._buffer, self._int_bytes = self._buffer, [], 0
+        return self._send(list_batch)
+
+    def flush(self):
+        with self._lock:
+            list_batch, self._buffer, self._int_bytes = self._buffer, [], 0
+        return self._send(list_batch)
+
+    def _send(self, list_batch):
+        if not list_batch:
+            return []
+        try:
+            list_results = self.master._createCasesBatched([x[1] for x in list_batch], "dca", "dcacase",
+                                                           int_batch_size=len(list_batch),
+                                                           int_max_bytes=max(self.int_max_bytes, 1) * 2,
+                                                           int_workers=1, int_retries=self.int_retries)
+        except Exception as err:
+            # The batch holds wells buffered by other workers too, every one of them gets an outcome
+            list_results = [{"status": "error", "response": None, "error": f"{type(err).__name__}: {err}"}
+                            for _ in list_batch]
+        list_outcomes = []
+        for (key, _), dict_result in zip(list_batch, list_results):
+            response = dict_result["response"] if isinstance(dict_result["response"], dict) else {}
+            dict_outcome = {"key": key, "status": "saved" if dict_result["status"] == "created" else "error",
+                            "case_id": response.get("id"), "error": dict_result["error"]}
+            list_outcomes.append(dict_outcome)
+        with self._lock:
+            for dict_outcome in list_outcomes:
+                self.outcomes[dict_outcome["key"]] = dict_outcome
+        return list_outcomes
+
+
+class _Pipeline:
+    """
+    Thread pipeline: stages connected by bounded queues, each stage served by its own pool of threads.
+
+    A stage function receives a list of up to int_batch items and returns a list of (bool_forward, payload):
+    forwarded payloads go to the next stage, the others are emitted as results. run() yields results in
+    completion order; an exception inside a stage is turned into a result through on_error(item, err).
+    A stage on_close() runs once its last worker is done and returns outputs the same way (e.g. a final flush);
+    if it raises, the error is printed and the end-of-stream signal is still passed downstream.
+    Closing run() before the end (break, close(), garbage collection) cancels the run: queued items are dropped,
+    every worker finishes its current batch, on_close hooks still run and all threads are joined.
+    """
+    _STOP = object()
+
+    def __init__(self, on_error, int_queue_size=64):
+        self.on_error = on_error
+        self.int_queue_size = int_queue_size
+        self.stages = []
+        self.on_close = {}
+
+    def addStage(self, func, int_workers=1, int_batch=1, on_close=None):
+        self.stages.append((func, max(1, int_workers), max(1, int_batch)))
+        self.on_close[len(self.stages) - 1] = on_close
+        return self
+
+    def run(self, iter_items):
+        queues = [queue.Queue(maxsize=self.int_queue_size) for _ in self.stages]
+        q_results = queue.Queue()
+        remaining = [workers for _, workers, _ in self.stages]
+        lock = threading.Lock()
+        cancel = threading.Event()
+
+        def _put(q_stage, item):
+            # A full queue only blocks until the run is cancelled, so no thread outlives a closed run()
+            while not cancel.is_set():
+                try:
+                    q_stage.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def _feed():
+            for item in iter_items:
+                if cancel.is_set():
+                    return
+                _put(queues[0], item)
+            for _ in range(self.stages[0][1]):
+                _put(queues[0], self._STOP)
+
+        def _emit(int_stage, list_outputs):
+            for bool_forward, payload in list_outputs:
+                if bool_forward and int_stage + 1 < len(self.stages):
+                    _put(queues[int_stage + 1], payload)
+                else:
+                    q_results.put(payload)
+
+        def _work(int_stage):
+            func, _, int_batch = self.stages[int_stage]
+            bool_running = True
+            while bool_running and not cancel.is_set():
+                try:
+                    list_items = [queues[int_stage].get(timeout=0.1)]
+                except queue.Empty:
+                    continue
+                while len(list_items) < int_batch and list_items[-1] is not self._STOP:
+                    try:
+                        list_items.append(queues[int_stage].get_nowait())
+                    except queue.Empty:
+                        break
+                if list_items[-1] is self._STOP:
+                    list_items.pop()
+                    bool_running = False
+                if list_items:
+                    try:
+                        list_outputs = func(list_items)
+                    except Exception as err:
+                        list_outputs = [(False, self.on_error(item, err)) for item in list_items]
+                    _emit(int_stage, list_outputs)
+            with lock:
+                remaining[int_stage] -= 1
+                bool_last = remaining[int_stage] == 0
+            if bool_last:
+                try:
+                    if self.on_close.get(int_stage) is not None:
+                        _emit(int_stage, self.on_close[int_stage]())
+                except Exception as err:
+                    print(f"Pipeline stage {int_stage} on_close failed: {type(err).__name__}: {err}")
+                finally:
+                    # Downstream stages and run() wait for the end-of-stream signal, always send it
+                    if int_stage + 1 < len(self.stages):
+                        for _ in range(self.stages[int_stage + 1][1]):
+                            _put(queues[int_stage + 1], self._STOP)
+                    else:
+                        q_results.put(self._STOP)
+
+        threads = [threading.Thread(target=_feed, daemon=True)]
+        for int_stage, (_, int_workers, _) in enumerate(self.stages):
+            threads += [threading.Thread(target=_work, args=(int_stage,), daemon=True) for _ in range(int_workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                result = q_results.get()
+                if result is self._STOP:
+                    break
+                yield result
+        finally:
+            # Consumer gone (break, close or garbage collection): stop the stages and wait for them, so the
+            # on_close hooks (e.g. the last partial save batch) still run
+            cancel.set()
+            for q_stage in queues:
+                while True:
+                    try:
+                        q_stage.get_nowait()
+                    except queue.Empty:
+                        break
+            for thread in threads:
+                thread.join()
+
+
+class DCA:
+    def __init__(self, refresh_masters=False):
+        """
+        Templates come from the session cache and dcamasterdict is only fetched when missing (createDCAMaster
+        keeps it current), so constructing a DCA costs no request after the first one. refresh_masters=True
+        fetches dcamasterdict and the templates again
+        """
+        self.master = Singleton().master
+        self.datasource = "dca"
+        self.master_name = "dcamaster"
+        if refresh_masters:
+            self.master.clearTemplateCache()
+        self.DCATemplate = self._getDCATemplate()
+        if refresh_masters or not getattr(self.master, "dcamasterdict", None):
+            self.master.dcamasterdict = self.master._getGenericDict("dcamaster")
+
+    def _getDCATemplate(self):
+        return self.master._getTemplate("/api/dca/forecast/")
+        
+    def createDCAMaster(self, dca_master_dict):
+        """
+        {
+            "description": "Function that creates master for DCA Data",
+            "arguments" : {
+                "dict_main":{
                     "name": "DCA A",
                     "dca_method": "ARPS",
                     "forecast_type": "DET",
@@ -2336,100 +3907,452 @@ class DCA:
         dict_dca_master = self.master._createMaster("dca", "dcamaster", dca_master_dict)
         return dict_dca_master
         
-    def runDCA(self, dict_dca):
+    def runDCA(self, dict_dca, int_workers: int = 1, int_fit_workers: Optional[int] = None,
+               str_fit_pool: str = "thread", int_fit_batch: int = 64, int_queue_size: int = 64,
+               int_save_batch: int = 200, callback=None):
         """
         {
-        "description": "Function that creates a DCA master and then the cases for multiple wells",
+        "description": "Function that creates a DCA master and then the cases for multiple wells. Wells flow through a fetch -> filter -> fit -> save pipeline connected by bounded queues; int_workers threads serve the I/O stages and int_fit_workers the fit stage (threads for server fits, processes when str_engine is local and str_fit_pool is process). Cases are saved through a DCACaseBatcher in batches of int_save_batch (0 posts one case per well). callback, if given, is called with each well's result as soon as it completes; see iterDCA for a generator",
         "arguments":
             {
                 "str_dca_name": "",
                 "list_well_names": ["well 1", "well 2"],
                 "date_primary_forecast": ["YYYY-MM-DD", "YYYY-MM-DD"],
                 "str_arps": ["HYPE", "HYPE"],
-                "str_date_prod": "monthly"
+                "str_date_prod": "monthly",
+                "str_engine": "server | local (ArpsEngine, wells fitted in batches of int_fit_batch)",
+                "bool_use_cache": "True, reuse fits of unchanged inputs from the session fit cache (see setFitCache)",
+                "bool_filter_anomalies": "False, leave downtime and outlier months out of the fit window (Generic.flagProductionAnomalies)",
+                "dict_anomalies": "{} | flagProductionAnomalies arguments, e.g. {'int_window': 7, 'float_threshold': 3.5}"
             },
-        "example": ""
+        "return": {
+            "dcamaster_fk": 1,
+            "wells": [{"well_name": "well 1", "status": "saved | nofit | noprod | error", "case_id": 1, "error": None, "primary_phase_beta": 0.5, "primary_phase_decline": 0.3, "primary_phase_reserves": 1000.0, "timings": {"fetch": 0.1, "fit": 0.2, "save": 0.1}}],
+            "wells_nofit": [],
+            "wells_noprod": [],
+            "wells_error": [],
+            "timings": {"total": 1.0, "fetch": 0.1, "fit": 0.2, "save": 0.1}
+            },
+        "example": "mydca.runDCA(dict_dca, int_workers=8, str_fit_pool='process', callback=print)"
         }
         """
+        float_start = time.time()
+        dict_run = {"dcamaster_fk": None, "wells": [], "wells_nofit": [], "wells_noprod": [], "wells_error": [],
+                    "timings": {}}
+        list_results = self._iterDCAPipeline(dict_dca, dict_run, int_workers, int_fit_workers, str_fit_pool,
+                                             int_fit_batch, int_queue_size, int_save_batch)
+        if isinstance(list_results, str):
+            return list_results
+        self._collectDCARun(dict_run, self._streamDCAResults(list_results, dict_run, callback), float_start)
+        set_saved = {x["well_name"] for x in dict_run["wells"] if x["status"] == "saved"}
+        wells_saved = [x for x in dict_dca["list_well_names"] if x in set_saved]
+        print(f"Total analyzed wells:\n{len(dict_dca['list_well_names'])} \nWells with DCA: \n{wells_saved}\nWells with issues: \n{dict_run['wells_nofit']}\nWells without production: \n{dict_run['wells_noprod']}\nWells with errors: \n{dict_run['wells_error']}")
+        return dict_run
+
+    def iterDCA(self, dict_dca, int_workers: int = 1, int_fit_workers: Optional[int] = None,
+                str_fit_pool: str = "thread", int_fit_batch: int = 64, int_queue_size: int = 64,
+                int_save_batch: int = 0, callback=None):
+        """
+        {
+        "description": "Streaming variant of runDCA: creates the DCA master and starts the pipeline right away, then yields every well's result as soon as it is final (saved, nofit, noprod or error), in completion order. callback, if given, is also called with each result. Same arguments as runDCA, except that cases are saved one per well by default (int_save_batch=0) so a saved well is yielded right after its own save; a larger int_save_batch sends fewer requests but yields saved wells in bursts of that size. The iteration has to be consumed for the run to complete; stopping early (break, close or garbage collection) cancels the wells still queued, flushes the pending save batch and stops the pipeline threads",
+        "arguments": "see runDCA",
+        "return": "generator of {'dcamaster_fk': 1, 'well_name': 'well 1', 'status': 'saved', 'case_id': 1, 'error': None, 'primary_phase_beta': 0.5, ...}",
+        "example": "for dict_result in mydca.iterDCA(dict_dca, int_workers=8): print(dict_result['well_name'], dict_result['status'])"
+        }
+        """
+        dict_run = {"dcamaster_fk": None, "timings": {}}
+        list_results = self._iterDCAPipeline(dict_dca, dict_run, int_workers, int_fit_workers, str_fit_pool,
+                                             int_fit_batch, int_queue_size, int_save_batch)
+        if isinstance(list_results, str):
+            raise ValueError(list_results)
+        return self._streamDCAResults(list_results, dict_run, callback)
+
+    def _streamDCAResults(self, list_results, dict_run, callback=None):
+        try:
+            for dict_result in list_results:
+                dict_result["dcamaster_fk"] = dict_run["dcamaster_fk"]
+                if callback is not None:
+                    try:
+                        callback(dict_result)
+                    except Exception as err:
+                        # A failing consumer must not stop the wells still in flight
+                        print(f"DCA callback failed for {dict_result['well_name']}: {err}")
+                yield dict_result
+        finally:
+            # Stopping early cancels the pipeline and waits for its threads (see _Pipeline.run)
+            list_results.close()
+
+    def refreshDCA(self, dcamaster_fk, dict_dca: Optional[dict] = None, int_workers: int = 1,
+                   int_fit_workers: Optional[int] = None, str_fit_pool: str = "thread", int_fit_batch: int = 64,
+                   int_queue_size: int = 64, int_save_batch: int = 200):
+        """
+        {
+        "description": "Incrementally re-forecast an existing DCA master. The stored dcacase records are compared with current production: wells whose selected history (x_selected / y_selected) or arps type did not change are left untouched, changed wells are refitted and their case updated in place, and wells without a case that now meet the fit criteria get a new one. dict_dca is optional; by default the wells, arps types and forecast dates of the stored cases are reused, and wells listed in dict_dca are added or override them",
+        "arguments":
+            {
+                "dcamaster_fk": 1,
+                "dict_dca": {
+                    "list_well_names": ["well 3"],
+                    "date_primary_forecast": ["YYYY-MM-DD"],
+                    "str_arps": ["HYPE"],
+                    "str_date_prod": "monthly",
+                    "str_engine": "server | local"
+                }
+            },
+        "return": {
+            "dcamaster_fk": 1,
+            "wells": [{"well_name": "well 1", "status": "unchanged | updated | saved | nofit | noprod | error", "case_id": 1}],
+            "wells_unchanged": [],
+            "wells_updated": [],
+            "wells_created": [],
+            "wells_nofit": [],
+            "wells_noprod": [],
+            "wells_error": [],
+            "timings": {"total": 1.0}
+            },
+        "example": "mydca.refreshDCA(12, int_workers=8)"
+        }
+        """
+        float_start = time.time()
+        cases = self.getDCACases(str(dcamaster_fk))
+        list_cases = cases.get("data", []) if isinstance(cases, dict) else cases
+        dict_wellnames = {well_fk: well_name for well_name, well_fk in self.master.wellmasterdict.items()}
+        dict_existing = {}
+        for case in list_cases:
+            well_name = case.get("well_name") or dict_wellnames.get(case.get("well_fk"))
+            if well_name is None:
+                continue
+            plot_data = case.get("primary_plot_data") or {}
+            if isinstance(plot_data, str):
+                plot_data = json.loads(plot_data)
+            dict_existing[well_name] = {"id": case["id"], "arps_type": case.get("arps_type"),
+                                        "primary_forecast_date": case.get("primary_forecast_date"),
+                                        "x_selected": plot_data.get("x_selected"),
+                                        "y_selected": plot_data.get("y_selected")}
+        dict_dca = dict(dict_dca or {})
+        dict_wells = {well_name: (case["primary_forecast_date"] or datetime.today().strftime('%Y-%m-%d'),
+                                  case["arps_type"] or "HYPE") for well_name, case in dict_existing.items()}
+        for well_name, date_forecast, str_arps in zip(dict_dca.get("list_well_names", []),
+                                                      dict_dca.get("date_primary_forecast", []),
+                                                      dict_dca.get("str_arps", [])):
+            dict_wells[well_name] = (date_forecast, str_arps)
+        dict_dca["list_well_names"] = list(dict_wells)
+        dict_dca["date_primary_forecast"] = [x[0] for x in dict_wells.values()]
+        dict_dca["str_arps"] = [x[1] for x in dict_wells.values()]
+        dict_dca.setdefault("str_date_prod", "monthly")
+        dict_run = {"dcamaster_fk": dcamaster_fk, "wells": [], "wells_unchanged": [], "wells_updated": [],
+                    "wells_created": [], "wells_nofit": [], "wells_noprod": [], "wells_error": [], "timings": {}}
+        list_results = self._iterDCAPipeline(dict_dca, dict_run, int_workers, int_fit_workers, str_fit_pool,
+                                             int_fit_batch, int_queue_size, int_save_batch,
+                                             dcamaster_fk=dcamaster_fk, dict_existing=dict_existing)
+        if isinstance(list_results, str):
+            return list_results
+        self._collectDCARun(dict_run, list_results, float_start)
+        print(f"Refreshed wells:\n{len(dict_dca['list_well_names'])} \nUnchanged: {len(dict_run['wells_unchanged'])} "
+              f"\nUpdated: {len(dict_run['wells_updated'])} \nCreated: {len(dict_run['wells_created'])} "
+              f"\nWells with issues: \n{dict_run['wells_nofit'] + dict_run['wells_noprod'] + dict_run['wells_error']}")
+        return dict_run
+
+    def _collectDCARun(self, dict_run, list_results, float_start):
+        """
+        Internal Function
+        Fold the per-well pipeline results into the run summary of runDCA / refreshDCA
+        """
+        dict_lists = {"nofit": "wells_nofit", "noprod": "wells_noprod", "error": "wells_error",
+                      "unchanged": "wells_unchanged", "updated": "wells_updated", "saved": "wells_created"}
+        for dict_result in list_results:
+            dict_run["wells"].append(dict_result)
+            str_list = dict_lists.get(dict_result["status"])
+            if str_list in dict_run:
+                dict_run[str_list].append(dict_result["well_name"])
+        for str_stage in ("fetch", "fit", "save"):
+            dict_run["timings"][str_stage] = sum(x["timings"].get(str_stage, 0.0) for x in dict_run["wells"])
+        dict_run["timings"]["total"] = time.time() - float_start
+        return dict_run
+
+    @staticmethod
+    def _dcaInputsChanged(dict_case, str_arps, x_selected, rates):
+        if dict_case.get("arps_type") and dict_case["arps_type"] != str_arps:
+            return True
+        x_stored, y_stored = dict_case.get("x_selected"), dict_case.get("y_selected")
+        if x_stored is None or y_stored is None or list(x_stored) != list(x_selected) or len(y_stored) != len(rates):
+            return True
+        return not np.allclose(np.asarray(y_stored, dtype=float), np.asarray(rates, dtype=float),
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    def _iterDCAPipeline(self, dict_dca, dict_run, int_workers=1, int_fit_workers=None, str_fit_pool="thread",
+                         int_fit_batch=64, int_queue_size=64, int_save_batch=200, dcamaster_fk=None,
+                         dict_existing=None):
+        """
+        Internal Function
+        Sets the run up (template, master, fit windows) and returns the generator of per-well results of the
+        fetch -> filter -> fit -> save pipeline, in completion order. With dcamaster_fk and dict_existing
+        (well_name -> stored case) the run refreshes that master instead of creating a new one
+        """
         mygeneric = Generic()
         list_check = mygeneric.lists_have_same_length(dict_dca["list_well_names"], dict_dca["date_primary_forecast"], dict_dca["str_arps"])
         if not list_check:
             return "All lists provided need to have the same size"
-        url = self.master.root_url + "/api/dca/fit_forecast/"
-        header = self.master.header
-        mydata = requests.get(url, headers=header)
-        dca_template_fit_forecast_base = mydata.json()
-        wells_nofit = []
-        wells_noprod = []
-        print("DCA Master")
-        dca_master = self.createDCAMaster(dict_dca)
-        dcamaster_fk = dca_master['id']
-        mydatasource = Datasource()
-        list_well_ids = [item["id"] for item in mydatasource.getWells().list for well in dict_dca["list_well_names"] if item["well_name"] == well]
-        #list_well_names = [item["well_name"] for item in mydatasource.getWells().list for well in dict_dca["list_well_names"] if item["well_name"] == well]
+        if dict_dca["str_date_prod"] not in ("monthly", "daily"):
+            return "Wrong date frequency"
+        dca_template_fit_forecast_base = self.master._getTemplate("/api/dca/fit_forecast/")
+        str_template_version = self.master._getTemplateVersion("/api/dca/fit_forecast/")
+        dict_existing = dict_existing or {}
+        if dcamaster_fk is None:
+            print("DCA Master")
+            dca_master = self.createDCAMaster(dict_dca)
+            dcamaster_fk = dca_master['id']
+        dict_run["dcamaster_fk"] = dcamaster_fk
         count_time_to_fit = 60
         count_time_to_discard_well_if_zero_rates = 6
         if (dict_dca["str_date_prod"] == "daily") or (dict_dca["str_date_prod"] == "monthly"):
             count_time_to_fit = int(count_time_to_fit * 30.5)
             count_time_to_discard_well_if_zero_rates = int(count_time_to_discard_well_if_zero_rates * 30.5)
-        else:
-            print("No valid time")
-        mydatasourceeda = DatasourceEDA()
-        dict_replace = mydatasourceeda.invert_dict(self.master.wellmasterdict)
-        for n, well_fk in enumerate(dict_dca["list_well_names"]):
-            if dict_dca["str_date_prod"] == "monthly":
-                well_monthly_dict = {}
-                well_monthly_dict['data'] = mydatasource.getMonthlyProduction([well_fk]).list
-                dates = [x['date'] for x in well_monthly_dict['data']]
-                dates = [datetime.strptime(x, "%Y-%m-%d") for x in dates]
-                rates = [x["oil_rate"] for x in well_monthly_dict['data']]
-                dates_or, rates_or = dates, rates
-            elif dict_dca["str_date_prod"] == "daily":
-                well_daily_dict = {}
-                well_daily_dict['data'] = mydatasource.getDailyProduction([well_fk]).list
-                dates = [x['date'] for x in well_daily_dict['data']]
-                dates = [datetime.strptime(x, "%Y-%m-%d") for x in dates]
-                rates = [x["oil_rate"] for x in well_daily_dict['data']]
-                dates_or, rates_or = dates, rates
-            else:
-                print("Wrong date frequency")
-                break
-            dates, rates = mygeneric.filterProductionData(dates_or, rates_or, count_time_to_fit, 'YES')
-            # print("rates_or: ", rates_or)
-            # print(well_fk, sum(rates[-6:]), " all rates: "  , rates[-6:])
-            if len(dates) <= 1:
-                ##print(well_fk)
-                wells_nofit.append(well_fk)
-            elif sum(rates_or[-count_time_to_discard_well_if_zero_rates:]) <= 0:
-                wells_noprod.append(well_fk)
+
+        dict_anomalies = None
+        if dict_dca.get("bool_filter_anomalies"):
+            dict_anomalies = dict(dict_dca.get("dict_anomalies") or {})
+
+        def _preprocess(df_production):
+            df_selected, df_wells = mygeneric.preprocessProductionData(df_production, count_time_to_fit,
+                                                                       count_time_to_discard_well_if_zero_rates,
+                                                                       dict_anomalies=dict_anomalies)
+            dict_selected = {well_name: df_well for well_name, df_well in df_selected.groupby("well_name", sort=False)}
+            return dict_selected, df_wells.set_index("well_name").to_dict("index")
+
+        mydatasource = Datasource(refresh_masters=False)
+        dict_production, dict_wellstatus = {}, {}
+        if dict_dca["str_date_prod"] == "monthly":
+            # One chunked bulk fetch and one columnar preprocessing pass up front, the fetch stage only slices
+            float_stage = time.time()
+            df_production, dict_fetch_errors = mydatasource.getMonthlyProductionBulk(
+                dict_dca["list_well_names"], int_workers=max(1, int_workers), bool_errors=True)
+            dict_production, dict_wellstatus = _preprocess(df_production)
+            for well_name, str_error in dict_fetch_errors.items():
+                dict_wellstatus[well_name] = {"status": "error", "error": str_error, "last_rate": None}
+            dict_run["timings"]["prefetch"] = time.time() - float_stage
+        str_engine = dict_dca.get("str_engine", "server")
+        int_fit_workers = int_fit_workers or int_workers
+
+        def _fetch(list_tasks):
+            list_outputs = []
+            for task in list_tasks:
+                float_stage = time.time()
+                if dict_dca["str_date_prod"] == "monthly":
+                    dict_selected, dict_status = dict_production, dict_wellstatus
+                else:
+                    df_daily = mydatasource.getDailyProduction(task["well_name"]).df
+                    if len(df_daily):
+                        dict_selected, dict_status = _preprocess(df_daily.assign(well_name=task["well_name"]))
+                    else:
+                        dict_selected, dict_status = {}, {}
+                df_well = dict_selected.get(task["well_name"])
+                task["dates"] = df_well["date"].to_numpy(dtype="datetime64[D]") if df_well is not None else \
+                    np.array([], dtype="datetime64[D]")
+                task["rates"] = df_well["oil_rate"].tolist() if df_well is not None else []
+                task["production"] = dict_status.get(task["well_name"], {"status": "nofit", "last_rate": None})
+                task["timings"]["fetch"] = time.time() - float_stage
+                list_outputs.append((True, task))
+            return list_outputs
+
+        def _filter(list_tasks):
+            list_outputs = []
+            for task in list_tasks:
+                n = task["n"]
+                dates, rates = task["dates"], task["rates"]
+                if task["production"]["status"] != "ok":
+                    list_outputs.append((False, self._dcaWellResult(task, task["production"]["status"],
+                                                                    task["production"].get("error"))))
+                else:
+                    dca_template_fit_forecast = copy.deepcopy(dca_template_fit_forecast_base)
+                    dca_template_fit_forecast['arps_type'] = dict_dca["str_arps"][n]
+                    x_selected = np.datetime_as_string(dates, unit="D").tolist()
+                    dca_template_fit_forecast['x_selected'] = x_selected
+                    dca_template_fit_forecast['y_selected'] = rates
+                    dca_template_fit_forecast['primary_phase_forecast_rate'] = task["production"]["last_rate"]
+                    dca_template_fit_forecast['forecast_months'] = 420.0
+                    dca_template_fit_forecast['primary_forecast_date'] = dict_dca["date_primary_forecast"][n]
+                    dca_template_fit_forecast['primary_forecast_last_date'] = x_selected[-1]
+                    dca_template_fit_forecast['primary_phase_abandonment'] = 0.0
+                    dca_template_fit_forecast['fit_dates'] = x_selected
+                    dca_template_fit_forecast['reinitialize_choice'] = 'NO'
+                    dca_template_fit_forecast['fc_date_choice'] = "DEFAULT"
+                    dca_template_fit_forecast['fc_rate_choice'] = "LASTVALFIT"
+                    task.update({"x_selected": x_selected, "template": dca_template_fit_forecast})
+                    dict_case = dict_existing.get(task["well_name"])
+                    if dict_case is not None:
+                        task["case_id"] = dict_case["id"]
+                        if not self._dcaInputsChanged(dict_case, dict_dca["str_arps"][n], x_selected, rates):
+                            list_outputs.append((False, self._dcaWellResult(task, "unchanged",
+                                                                            case_id=dict_case["id"])))
+                            continue
+                    list_outputs.append((True, task))
+            return list_outputs
+
+        executor_fit = None
+        if str_engine == "local" and str_fit_pool == "process":
+            executor_fit = ProcessPoolExecutor(max_workers=int_fit_workers)
+
+        myfitcache = self.getFitCache() if dict_dca.get("bool_use_cache", True) else None
+
+        def _fit(list_tasks):
+            float_stage = time.time()
+            list_keys = [self._fitCacheKey(task, str_engine, str_template_version) for task in list_tasks] \
+                if myfitcache else []
+            list_forecasts = [myfitcache.get(key) for key in list_keys] if myfitcache else [None] * len(list_tasks)
+            list_missing = [i for i, dca_forecast in enumerate(list_forecasts) if dca_forecast is None]
+            list_templates = [list_tasks[i]["template"] for i in list_missing]
+            if not list_missing:
+                list_fitted = []
+            elif str_engine == "local" and executor_fit is not None:
+                list_fitted = executor_fit.submit(ArpsEngine().fitForecast, list_templates).result()
+            elif str_engine == "local":
+                list_fitted = self.fitForecastDCALocal(list_templates)
             else:
-                dca_template_fit_forecast = dca_template_fit_forecast_base
-                dca_template_fit_forecast['arps_type'] = dict_dca["str_arps"][n]
-                x_selected = [x.strftime('%Y-%m-%d') for x in dates]
-                dca_template_fit_forecast['x_selected'] = x_selected
-                dca_template_fit_forecast['y_selected'] = rates
-                dca_template_fit_forecast['primary_phase_forecast_rate'] = rates_or[-1]
-                dca_template_fit_forecast['forecast_months'] = 420.0
-                dca_template_fit_forecast['primary_forecast_date'] = dict_dca["date_primary_forecast"][n]
-                dca_template_fit_forecast['primary_forecast_last_date'] = x_selected[-1]
-                dca_template_fit_forecast['primary_phase_abandonment'] = 0.0
-                dca_template_fit_forecast['fit_dates'] = x_selected
-                dca_template_fit_forecast['reinitialize_choice'] = 'NO'
-                dca_template_fit_forecast['fc_date_choice'] = "DEFAULT"
-                dca_template_fit_forecast['fc_rate_choice'] = "LASTVALFIT"
-                #print("dca_template_fit_forecast: ",dca_template_fit_forecast)
-                dca_forecast = self.master._fitForecastDCA(dates, rates, dca_template_fit_forecast)
-                # print("dca_forecast: ",dca_forecast)
-                # dca_forecast['primary_phase_forecast_rate'] = rates_or[-1]
-                # dca_forecast['arps_type'] = dca_arps
-                #print(f"_saveDCA:\n {dcamaster_fk}\n{list_well_ids[n]}\n{dca_forecast}\n{x_selected}\n{rates}\n{dca_template_fit_forecast}")
-                self.master._saveDCA(dcamaster_fk, list_well_ids[n], dca_forecast, x_selected, rates, dca_template_fit_forecast)
-        #print("Total analyzed wells: ", len(dict_dca["list_well_names"]))#, "\nWells with issues: ",
-              #[self.master._getKeyFromDict(well, self.master.wellmasterdict) for well in wells_nofit], "\n Total with issues: ",
-              #len(wells_nofit), [self.master._getKeyFromDict(well, self.master.wellmasterdict) for well in wells_noprod],
-              #"\n Total with no Production in the last 6 months: ", len(wells_noprod))
-        #print(f"Total analyzed wells: {len(dict_dca['list_well_names'])} \nWells with issues: {wells_nofit}")
-        print(f"Total analyzed wells:\n{len(dict_dca['list_well_names'])} \nWells with DCA: \n{[x for x in dict_dca['list_well_names'] if x not in wells_nofit]}\nWells with issues: \n{wells_nofit}")
+                list_fitted = [self.master._fitForecastDCA(list_tasks[i]["dates"], list_tasks[i]["rates"],
+                                                           list_tasks[i]["template"]) for i in list_missing]
+            for i, dca_forecast in zip(list_missing, list_fitted):
+                list_forecasts[i] = dca_forecast
+                if myfitcache and isinstance(dca_forecast, dict) and "forecast" in dca_forecast \
+                        and not dca_forecast.get("error"):
+                    myfitcache.set(list_keys[i], dca_forecast)
+            float_per_well = (time.time() - float_stage) / len(list_tasks)
+            list_outputs = []
+            for task, dca_forecast in zip(list_tasks, list_forecasts):
+                task["dca_forecast"] = dca_forecast
+                task["timings"]["fit"] = float_per_well
+                if dca_forecast.get("error"):
+                    list_outputs.append((False, self._dcaWellResult(task, "error", dca_forecast["error"])))
+                else:
+                    list_outputs.append((True, task))
+            return list_outputs
+
+        mybatcher = DCACaseBatcher(int_batch_size=int_save_batch) if int_save_batch else None
+        dict_pending = {}
+
+        def _savedResults(list_outcomes):
+            list_outputs = []
+            for dict_outcome in list_outcomes:
+                task = dict_pending.pop(dict_outcome["key"])
+                task["timings"]["save"] = time.time() - task["timings"].pop("save_queued")
+                if dict_outcome["status"] == "saved":
+                    list_outputs.append((False, self._dcaWellResult(task, "saved", case_id=dict_outcome["case_id"])))
+                else:
+                    list_outputs.append((False, self._dcaWellResult(task, "error", dict_outcome["error"])))
+            return list_outputs
+
+        def _update(task):
+            # Refreshed wells keep their case, which is edited in place
+            float_stage = time.time()
+            dca_save_dict = self.master._buildDCASaveDict(dcamaster_fk, task["well_fk"], task["dca_forecast"],
+                                                          task["x_selected"], task["rates"], task["template"])
+            try:
+                mydata = self.master._putCase("dca", "dcacase", dca_save_dict, task["case_id"])
+                dca_update = mydata.json() if 200 <= mydata.status_code < 300 else \
+                    f"{mydata.status_code}: {mydata.text[:500]}"
+            except (requests.exceptions.RequestException, ValueError) as err:
+                dca_update = f"{type(err).__name__}: {err}"
+            task["timings"]["save"] = time.time() - float_stage
+            if isinstance(dca_update, dict) and "id" in dca_update:
+                return (False, self._dcaWellResult(task, "updated", case_id=dca_update["id"]))
+            return (False, self._dcaWellResult(task, "error", f"Case not updated: {dca_update}"))
+
+        def _save(list_tasks):
+            list_updates = [_update(task) for task in list_tasks if "case_id" in task]
+            list_tasks = [task for task in list_tasks if "case_id" not in task]
+            return list_updates + _create(list_tasks)
+
+        def _create(list_tasks):
+            if mybatcher is not None:
+                list_outcomes = []
+                for task in list_tasks:
+                    task["timings"]["save_queued"] = time.time()
+                    dict_pending[task["n"]] = task
+                    dca_save_dict = self.master._buildDCASaveDict(dcamaster_fk, task["well_fk"], task["dca_forecast"],
+                                                                  task["x_selected"], task["rates"], task["template"])
+                    list_outcomes += mybatcher.add(task["n"], dca_save_dict)
+                return _savedResults(list_outcomes)
+            list_outputs = []
+            for task in list_tasks:
+                float_stage = time.time()
+                dca_save = self.master._saveDCA(dcamaster_fk, task["well_fk"], task["dca_forecast"],
+                                                task["x_selected"], task["rates"], task["template"])
+                task["timings"]["save"] = time.time() - float_stage
+                if isinstance(dca_save, tuple) and isinstance(dca_save[0], dict) and "id" in dca_save[0]:
+                    list_outputs.append((False, self._dcaWellResult(task, "saved", case_id=dca_save[0]["id"])))
+                else:
+                    list_outputs.append((False, self._dcaWellResult(task, "error", f"Case not saved: {dca_save}")))
+            return list_outputs
+
+        def _onError(task, err):
+            return self._dcaWellResult(task, "error", str(err))
+
+        mypipeline = _Pipeline(_onError, int_queue_size=int_queue_size)
+        mypipeline.addStage(_fetch, int_workers)
+        mypipeline.addStage(_filter, 1)
+        mypipeline.addStage(_fit, int_fit_workers, int_fit_batch if str_engine == "local" else 1)
+        mypipeline.addStage(_save, int_workers,
+                            on_close=(lambda: _savedResults(mybatcher.flush())) if mybatcher is not None else None)
+        iter_tasks = ({"n": n, "well_name": well_name, "well_fk": self.master.wellmasterdict.get(well_name),
+                       "timings": {}} for n, well_name in enumerate(dict_dca["list_well_names"]))
+
+        def _iterResults():
+            iter_run = mypipeline.run(iter_tasks)
+            try:
+                for dict_result in iter_run:
+                    yield dict_result
+            finally:
+                iter_run.close()
+                if executor_fit is not None:
+                    executor_fit.shutdown()
+        return _iterResults()
+
+    def setFitCache(self, int_max_items: int = 2048, str_cache_dir: Optional[str] = None):
+        """
+        {
+        "description": "Configure the session DCA fit cache: in-memory LRU size and optional on-disk directory, so unchanged wells are not refitted across runs and sessions",
+        "arguments": {"int_max_items": 2048, "str_cache_dir": "None | path"},
+        "return": "ResultCache"
+        }
+        """
+        self.master.dca_fit_cache = ResultCache(int_max_items=int_max_items, str_cache_dir=str_cache_dir)
+        return self.master.dca_fit_cache
+
+    def getFitCache(self):
+        if getattr(self.master, "dca_fit_cache", None) is None:
+            self.setFitCache()
+        return self.master.dca_fit_cache
+
+    def _fitCacheKey(self, task, str_engine, str_template_version=None):
+        # Everything the fit and forecast depend on; the master name is deliberately left out
+        template = task["template"]
+        return ResultCache.fingerprint({
+            "engine": str_engine,
+            "template_version": str_template_version if str_engine == "server" else None,
+            "well": task["well_name"],
+            "arps_type": template.get("arps_type"),
+            "x_selected": template.get("x_selected"),
+            "y_selected": template.get("y_selected"),
+            "forecast": {key: template.get(key) for key in (
+                "primary_phase_forecast_rate", "forecast_months", "primary_forecast_date",
+                "primary_forecast_last_date", "primary_phase_abandonment", "fc_date_choice", "fc_rate_choice",
+                "reinitialize_choice")},
+        })
+
+    def _dcaWellResult(self, task, str_status, str_error=None, case_id=None):
+        dca_forecast = task.get("dca_forecast") or {}
+        return {
+            "well_name": task["well_name"],
+            "well_fk": task["well_fk"],
+            "status": str_status,
+            "case_id": case_id,
+            "error": str_error,
+            "arps_type": task.get("template", {}).get("arps_type"),
+            "primary_phase_beta": dca_forecast.get("primary_phase_beta"),
+            "primary_phase_decline": dca_forecast.get("primary_phase_decline"),
+            "primary_phase_reserves": dca_forecast.get("primary_phase_reserves"),
+            "timings": task["timings"],
+        }
 
     def autoDCA(self, dict_dca):
         """
@@ -2443,6 +4366,18 @@ class DCA:
         response = self.master.generic_request('/api/dca/auto_dca/', "post", data=dict_dca)
         return response.json()
 
+    def submitAutoDCA(self, dict_dca, job_pool=None):
+        """
+        {
+        "description": "Non-blocking autoDCA: queues the run on a JobPool (the session pool by default) and returns its AlanaJob",
+        "arguments": {"dict_dca": "same as autoDCA", "job_pool": "None | JobPool"},
+        "return": "AlanaJob, job.result() gives the autoDCA response"
+        }
+        """
+        job_pool = job_pool or self.master._getJobPool()
+        return job_pool.submit(f"autodca {dict_dca.get('str_dca_name', '')}".strip(), "post", "/api/dca/auto_dca/",
+                               data=dict_dca)
+
     def editDCAMaster(self, master_fk: int, dict_edit_master: dict):
         dict_edit_master = self.master._editMaster("dca", "dcamaster", dict_edit_master, str(master_fk))
         return dict_edit_master
@@ -2476,63 +4411,1130 @@ class DCA:
     def fitForecastDCA(self, dca_template_fit_forecast):
         url = self.master.root_url + "/api/dca/fit_forecast/"
         dca_template_fit_forecast = json.dumps(dca_template_fit_forecast)
-        header = self.master.header
+        header = dict(self.master.header)
         header["content-type"] = "application/json"
         mydata = requests.post(url, headers=header, data=dca_template_fit_forecast)  # .json()
         dca_forecast = mydata.json()
         # print("fit_forecast:",dca_forecast)
         return dca_forecast
 
-    def saveDCA(self, dcamaster_fk, well_fk, dca_forecast, x_selected, rates, dca_template_fit_forecast):
-        dca_save_dict = dca_template_fit_forecast
-        dca_save_dict['fit_type'] = 'AUTO'
-        dca_save_dict['secondary_forecast_type'] = 'RATIO'
-        dca_save_dict['water_forecast_type'] = 'RATIO'
-        dca_save_dict['secondary_phase_ratio'] = 0.8
-        dca_save_dict['water_phase_ratio'] = 0.8
-        dca_save_dict['primary_plot_layout'] = None
-        dca_save_dict['secondary_plot_data'] = None
-        dca_save_dict['secondary_plot_layout'] = None
-        dca_save_dict["oil_reserves"] = dca_forecast["primary_phase_reserves"]
-        dca_save_dict["gas_reserves"] = dca_forecast["gas_reserves"]
-        dca_save_dict["water_reserves"] = dca_forecast["water_reserves"]
+    def _dcaCaseParams(self, list_cases: list):
+        """
+        Internal Function
+        Decline parameters of stored dcacase records, moved to the last fitted date: the stored decline refers to
+        the first selected date, so it is advanced along the hyperbola to the last one. The rate there is read from
+        the fitted curve (primary_plot_data fit), not the last measured rate, which is 0 for a well whose last
+        months are shut in
+        """
+        dict_wellnames = {well_fk: well_name for well_name, well_fk in self.master.wellmasterdict.items()}
+        list_rows = []
+        for case in list_cases:
+            plot_data = case.get("primary_plot_data") or {}
+            if isinstance(plot_data, str):
+                plot_data = json.loads(plot_data)
+            x_selected = plot_data.get("x_selected") or []
+            y_selected = plot_data.get("y_selected") or []
+            fit = plot_data.get("fit") or []
+            rate = None
+            # Fitted rate at the last selected date, then the stored rate and the last positive selected rate
+            for candidate in [fit[-1] if fit else None, case.get("primary_phase_fit_rate")] + y_selected[::-1]:
+                try:
+                    if float(candidate) > 0:
+                        rate = float(candidate)
+                        break
+                except (TypeError, ValueError):
+                    continue
+            list_rows.append({
+                "dcacase_fk": case.get("id"),
+                "well_fk": case.get("well_fk"),
+                "well_name": case.get("well_name") or dict_wellnames.get(case.get("well_fk")),
+                "first_date": x_selected[0] if x_selected else None,
+                "anchor_date": x_selected[-1] if x_selected else case.get("primary_forecast_date"),
+                "primary_forecast_date": case.get("primary_forecast_date") or (x_selected[-1] if x_selected else None),
+                "rate": rate,
+                "decline": case.get("primary_phase_decline"),
+                "beta": case.get("primary_phase_beta"),
+                "forecast_months": case.get("forecast_months") or 420,
+                "abandonment": case.get("primary_phase_abandonment") or 0.0,
+            })
+        df_params = pd.DataFrame(list_rows, columns=["dcacase_fk", "well_fk", "well_name", "first_date", "anchor_date",
+                                                     "primary_forecast_date", "rate", "decline", "beta",
+                                                     "forecast_months", "abandonment"])
+        for col in ("rate", "decline", "beta", "forecast_months", "abandonment"):
+            df_params[col] = pd.to_numeric(df_params[col], errors="coerce")
+        df_params = df_params.dropna(subset=["rate", "decline", "beta", "anchor_date", "primary_forecast_date"])
+        df_params = df_params.reset_index(drop=True)
+        t_anchor = (pd.to_datetime(df_params["anchor_date"]) - pd.to_datetime(df_params["first_date"])).dt.days
+        t_anchor = t_anchor.fillna(0).to_numpy(dtype=float)
+        decline, beta = df_params["decline"].to_numpy(), df_params["beta"].to_numpy()
+        df_params["decline_anchor"] = decline / (1.0 + beta * decline / ArpsEngine.DAYS_PER_YEAR * t_anchor)
+        return df_params
+
+    def _getDCACaseList(self, master_fk=None, list_cases=None):
+        if list_cases is None:
+            cases = self.getDCACases(str(master_fk))
+            list_cases = cases.get("data", []) if isinstance(cases, dict) else cases
+        return list_cases
+
+    def forecastDCACases(self, master_fk=None, list_cases: Optional[list] = None, int_months: Optional[int] = None,
+                         abandonment: Optional[float] = None, cum_production: Optional[dict] = None,
+                         economicforecastmaster_fk=None):
+        """
+        {
+        "description": "Regenerate the forecasts of stored dcacase records locally with ArpsEngine, all wells in one vectorized pass, and compute remaining reserves and EUR per well. Cases come from getDCACases(master_fk) or list_cases. EUR adds cum_production (well_name -> produced volume before the forecast start) when given",
+        "arguments": {
+            "master_fk": 1,
+            "list_cases": "None | getDCACases records",
+            "int_months": "None (case forecast_months) | 420",
+            "abandonment": "None (case primary_phase_abandonment) | 5.0",
+            "cum_production": "None | {'well 1': 150000.0}",
+            "economicforecastmaster_fk": "None | 4, added to the economic forecast rows"
+            },
+        "return": {
+            "df_forecast": "DataFrame well_name, well_fk, dcacase_fk, date, oil_rate, oil (monthly volume)",
+            "df_reserves": "DataFrame well_name, well_fk, dcacase_fk, remaining_reserves, cum_production, eur, months_to_abandonment",
+            "df_economics": "DataFrame with the economicforecastcase columns, oil summed per month and active_wells",
+            "list_economics": "df_economics as records, ready for createEconomicForecastCases"
+            },
+        "example": "mydca.forecastDCACases(12, abandonment=5.0)"
+        }
+        """
+        df_params = self._dcaCaseParams(self._getDCACaseList(master_fk, list_cases))
+        if int_months is None:
+            int_months = int(df_params["forecast_months"].max()) if len(df_params) else 420
+        if abandonment is None:
+            abandonment = df_params["abandonment"].to_numpy()
+        cum = None
+        if cum_production is not None:
+            cum = df_params["well_name"].map(cum_production).fillna(0.0).to_numpy(dtype=float)
+        dict_forecast = ArpsEngine().forecastWells(df_params["rate"].to_numpy(), df_params["decline_anchor"].to_numpy(),
+                                                   df_params["beta"].to_numpy(),
+                                                   df_params["primary_forecast_date"].tolist(), int_months,
+                                                   abandonment, df_params["anchor_date"].tolist(), cum)
+        int_wells = len(df_params)
+        alive = dict_forecast["alive"]
+        rows, cols = np.nonzero(alive)
+        df_forecast = pd.DataFrame({
+            "well_name": df_params["well_name"].to_numpy()[rows],
+            "well_fk": df_params["well_fk"].to_numpy()[rows],
+            "dcacase_fk": df_params["dcacase_fk"].to_numpy()[rows],
+            "date": dict_forecast["dates"][rows, cols],
+            "oil_rate": dict_forecast["rates"][rows, cols],
+            "oil": dict_forecast["volumes"][rows, cols],
+        })
+        df_reserves = df_params[["well_name", "well_fk", "dcacase_fk"]].copy()
+        df_reserves["remaining_reserves"] = dict_forecast["remaining_reserves"]
+        df_reserves["cum_production"] = cum if cum is not None else np.zeros(int_wells)
+        df_reserves["eur"] = dict_forecast["eur"]
+        df_reserves["months_to_abandonment"] = dict_forecast["months_to_abandonment"]
+        df_economics = df_forecast.assign(date=df_forecast["date"].dt.to_period("M").dt.to_timestamp()).groupby("date").agg(
+            oil=("oil", "sum"), active_wells=("well_name", "nunique")).reset_index()
+        for col in ("wat", "gas", "wat_inj", "gas_inj", "steam_inj", "opex", "capex", "abandonment_cost",
+                    "total_cost_variable", "total_cost_fixed", "total_cost", "total_revenue", "cash_flow"):
+            df_economics[col] = None
+        if economicforecastmaster_fk is not None:
+            df_economics["economicforecastmaster_fk"] = economicforecastmaster_fk
+        return {
+            "df_forecast": df_forecast,
+            "df_reserves": df_reserves,
+            "df_economics": df_economics,
+            "list_economics": Generic().dataFrameToRecords(df_economics),
+        }
 
-        dca_save_dict['resources'] = None
-        dca_save_dict['cumprod'] = None
-        dca_save_dict['well_fk'] = well_fk
-        dca_save_dict['dcamaster_fk'] = dcamaster_fk
-        dca_save_dict["primary_phase_beta"] = dca_forecast["primary_phase_beta"]
-        dca_save_dict["primary_phase_decline"] = dca_forecast["primary_phase_decline"]
-        dca_save_dict["primary_phase_fit_rate"] = dca_template_fit_forecast["primary_phase_forecast_rate"]
-        # dca_save_dict["primary_phase_forecast_rate"] = dca_forecast["primary_phase_forecast_rate"]
-        # dca_save_dict["arps_type"] = dca_forecast["arps_type"]
-        try:
-            fit = dca_forecast["fit"]
-            time_fit = dca_forecast["time_fit"]
-        except:
-            fit = None
-            time_fit = None
-        dca_save_dict["primary_plot_data"] = {
-            'fit': fit,
-            'time_fit': time_fit,
-            'forecast': dca_forecast["forecast"],
-            'time_forecast': dca_forecast["time_forecast"],
-            'x_selected': x_selected,
-            'y_selected': rates,
-            'reinitialize_choice': 'NO',
-            'fc_date_choice': 'DEFAULT',
-            'fc_rate_choice': 'LASTVAL'
+    def monteCarloDCA(self, master_fk=None, list_cases: Optional[list] = None, int_realizations: int = 1000,
+                      qi_sigma=0.1, di_sigma=0.2, b_sigma=0.2, int_months: Optional[int] = None,
+                      abandonment: Optional[float] = None, percentiles=(10, 50, 90), int_max_cells: int = 2000000,
+                      seed=None):
+        """
+        {
+        "description": "Probabilistic counterpart of the deterministic DCA cases: samples qi, Di and b around the stored parameters of each dcacase (qi is the fitted rate at the last selected date, so shut-in final months do not zero the distribution) and returns percentile rate profiles and reserves per well, plus the portfolio distribution. Runs locally with ArpsEngine.monteCarlo, chunked to bound memory. Sigmas are floats or dicts well_name -> sigma",
+        "arguments": {
+            "master_fk": 1,
+            "list_cases": "None | getDCACases records",
+            "int_realizations": 1000,
+            "qi_sigma": 0.1,
+            "di_sigma": 0.2,
+            "b_sigma": 0.2,
+            "percentiles": [10, 50, 90],
+            "seed": "None | int"
+            },
+        "return": {
+            "df_profiles": "DataFrame well_name, well_fk, dcacase_fk, date, oil_rate_p10, oil_rate_p50, oil_rate_p90",
+            "df_reserves": "DataFrame well_name, well_fk, dcacase_fk, reserves_p10, reserves_p50, reserves_p90, reserves_mean",
+            "df_portfolio": "DataFrame date, oil_p10, oil_p50, oil_p90 (monthly volumes)",
+            "portfolio_reserves": {"P10": 1.0}
+            },
+        "example": "mydca.monteCarloDCA(12, int_realizations=2000, seed=1)"
+        }
+        """
+        df_params = self._dcaCaseParams(self._getDCACaseList(master_fk, list_cases))
+        if int_months is None:
+            int_months = int(df_params["forecast_months"].max()) if len(df_params) else 420
+        if abandonment is None:
+            abandonment = df_params["abandonment"].to_numpy()
+        list_sigmas = []
+        for sigma in (qi_sigma, di_sigma, b_sigma):
+            if isinstance(sigma, dict):
+                sigma = df_params["well_name"].map(sigma).fillna(0.0).to_numpy(dtype=float)
+            list_sigmas.append(sigma)
+        dict_mc = ArpsEngine().monteCarlo(df_params["rate"].to_numpy(), df_params["decline_anchor"].to_numpy(),
+                                          df_params["beta"].to_numpy(), df_params["primary_forecast_date"].tolist(),
+                                          int_months, abandonment, df_params["anchor_date"].tolist(),
+                                          int_realizations, *list_sigmas, percentiles=percentiles,
+                                          int_max_cells=int_max_cells, seed=seed)
+        labels = list(dict_mc["reserves"])
+        # Months where even the high case has stopped producing are dropped
+        rows, cols = np.nonzero(np.max([dict_mc["rates"][label] for label in labels], axis=0) > 0)
+        df_profiles = pd.DataFrame({
+            "well_name": df_params["well_name"].to_numpy()[rows],
+            "well_fk": df_params["well_fk"].to_numpy()[rows],
+            "dcacase_fk": df_params["dcacase_fk"].to_numpy()[rows],
+            "date": dict_mc["dates"][rows, cols],
+        })
+        df_reserves = df_params[["well_name", "well_fk", "dcacase_fk"]].copy()
+        df_portfolio = pd.DataFrame({"date": dict_mc["portfolio"]["dates"].astype("datetime64[D]")})
+        for label in labels:
+            df_profiles[f"oil_rate_{label.lower()}"] = dict_mc["rates"][label][rows, cols]
+            df_reserves[f"reserves_{label.lower()}"] = dict_mc["reserves"][label]
+            df_portfolio[f"oil_{label.lower()}"] = dict_mc["portfolio"]["volumes"][label]
+        df_reserves["reserves_mean"] = dict_mc["reserves_mean"]
+        return {
+            "df_profiles": df_profiles,
+            "df_reserves": df_reserves,
+            "df_portfolio": df_portfolio,
+            "portfolio_reserves": dict_mc["portfolio"]["reserves"],
+        }
+
+    def fitForecastDCALocal(self, list_templates: list):
+        """
+        {
+        "description": "In-process counterpart of fitForecastDCA for many wells at once, see ArpsEngine. Each template is the fit_forecast payload runDCA builds (x_selected, y_selected, arps_type, primary_forecast_date, ...)",
+        "arguments": [{"dca_template_fit_forecast"}],
+        "return": [{"primary_phase_beta", "primary_phase_decline", "fit", "time_fit", "forecast", "time_forecast", "primary_phase_reserves", "gas_reserves", "water_reserves"}]
         }
+        """
+        return ArpsEngine().fitForecast(list_templates)
+
+    def saveDCA(self, dcamaster_fk, well_fk, dca_forecast, x_selected, rates, dca_template_fit_forecast):
+        dca_save_dict = self.master._buildDCASaveDict(dcamaster_fk, well_fk, dca_forecast, x_selected, rates,
+                                                      dca_template_fit_forecast)
         try:
             dca_save_dict = json.dumps(dca_save_dict)
         except:
             return dca_save_dict
-        url = self.root_url + "/api/dca/dcacase/"
+        url = self.master.root_url + "/api/dca/dcacase/"
         header = self.master.header
         mydata = requests.post(url, headers=header, data=dca_save_dict)  # .json()
         dca_save = mydata.json()
         return dca_save, dca_save_dict
 
+    def saveDCACases(self, list_save_dicts: list, int_batch_size: int = 200, int_workers: int = 4):
+        """
+        {
+        "description": "Save many dcacase payloads (as built by _buildDCASaveDict) in size-bounded parallel batches, reporting the outcome of every case",
+        "arguments": [{"dcacase payload"}],
+        "return": [{"status": "created | error", "response": {"id": 1}, "error": None}]
+        }
+        """
+        return self.master._createCasesBatched(list_save_dicts, "dca", "dcacase", int_batch_size=int_batch_size,
+                                               int_workers=int_workers)
+
+
+class ArpsEngine:
+    """
+    In-process Arps decline engine (exponential, harmonic and hyperbolic) working on many wells at once.
+
+    Rates are daily rates and declines are nominal, per year. For a fixed b the hyperbola is linear in q^-b
+    (in log q for b = 0), so every b of the grid is solved in closed form for a whole chunk of wells and the b
+    with the lowest log-rate error is kept per well. Exponential and harmonic fits are the b = 0 and b = 1
+    members. Results mirror the /api/dca/fit_forecast/ payload so they can go through _saveDCA unchanged.
+    """
+    DAYS_PER_YEAR = 365.25
+
+    def __init__(self, b_grid=None, float_b_max: float = 2.0, int_chunk_wells: int = 2048):
+        if b_grid is None:
+            b_grid = np.round(np.arange(0.05, float_b_max + 1e-9, 0.05), 4)
+        self.b_grid = np.asarray(b_grid, dtype=float)
+        self.int_chunk_wells = int_chunk_wells
+
+    @staticmethod
+    def arpsFamily(arps_type):
+        str_type = str(arps_type).upper()
+        if str_type.startswith("EXP"):
+            return "EXP"
+        if str_type.startswith("HAR"):
+            return "HARM"
+        return "HYPE"
+
+    @classmethod
+    def rate(cls, qi, di, b, t_days):
+        """
+        Arps rate at t_days after the qi reference for broadcastable arrays of qi, di (nominal, 1/year) and b.
+        """
+        qi, di, b, t_days = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (qi, di, b, t_days)])
+        d = di / cls.DAYS_PER_YEAR
+        is_exp = b < 1e-6
+        b_safe = np.where(is_exp, 1.0, b)
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            base = np.maximum(1.0 + b_safe * d * t_days, 1e-12)
+            return np.where(is_exp, qi * np.exp(-d * t_days), qi * base ** (-1.0 / b_safe))
+
+    @classmethod
+    def cumulative(cls, qi, di, b, t_days):
+        """
+        Arps cumulative volume between the qi reference and t_days (rates per day, so volumes in rate units x days).
+        """
+        qi, di, b, t_days = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (qi, di, b, t_days)])
+        d = di / cls.DAYS_PER_YEAR
+        is_flat = d <= 1e-15
+        is_exp = b < 1e-6
+        is_harm = np.abs(b - 1.0) < 1e-6
+        d_safe = np.where(is_flat, 1.0, d)
+        b_safe = np.where(is_exp | is_harm, 0.5, b)
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            cum_exp = qi / d_safe * (1.0 - np.exp(-d_safe * t_days))
+            cum_harm = qi / d_safe * np.log1p(d_safe * t_days)
+            base = np.maximum(1.0 + b_safe * d_safe * t_days, 1e-12)
+            cum_hyp = qi / ((1.0 - b_safe) * d_safe) * (1.0 - base ** (1.0 - 1.0 / b_safe))
+        cum = np.where(is_exp, cum_exp, np.where(is_harm, cum_harm, cum_hyp))
+        return np.where(is_flat, qi * t_days, cum)
+
+    def fit(self, list_t_days: list, list_rates: list, list_arps_types: list):
+        """
+        {
+        "description": "Least-squares Arps fit of many wells. Non-positive rates are ignored, t is counted from the first point of each well",
+        "arguments": {
+            "list_t_days": [[0, 31, 59]],
+            "list_rates": [[100, 95, 91]],
+            "list_arps_types": ["HYPE"]
+            },
+        "return": {"qi": "array", "di": "array, nominal 1/year", "b": "array", "sse": "array, log-rate error", "n_points": "array"}
+        }
+        """
+        int_wells = len(list_rates)
+        dict_fit = {key: np.full(int_wells, np.nan) for key in ("qi", "di", "b", "sse")}
+        dict_fit["n_points"] = np.zeros(int_wells, dtype=int)
+        families = np.array([self.arpsFamily(x) for x in list_arps_types])
+        candidates = np.unique(np.concatenate([[0.0, 1.0], self.b_grid]))
+        for start in range(0, int_wells, self.int_chunk_wells):
+            stop = min(start + self.int_chunk_wells, int_wells)
+            int_len = max([len(x) for x in list_rates[start:stop]] + [1])
+            t = np.zeros((stop - start, int_len))
+            q = np.zeros((stop - start, int_len))
+            for row, n in enumerate(range(start, stop)):
+                t[row, :len(list_t_days[n])] = np.asarray(list_t_days[n], dtype=float)
+                q[row, :len(list_rates[n])] = np.asarray(list_rates[n], dtype=float)
+            mask = q > 0
+            log_q = np.log(np.where(mask, q, 1.0))
+            n_points = mask.sum(axis=1)
+            chunk_families = families[start:stop]
+            best = {key: np.full(stop - start, np.nan) for key in ("qi", "di", "b")}
+            best["sse"] = np.full(stop - start, np.inf)
+            for b in candidates:
+                allowed = ((chunk_families == "HYPE") & bool(np.isin(b, self.b_grid))) \
+                    | ((chunk_families == "EXP") & (b == 0.0)) | ((chunk_families == "HARM") & (b == 1.0))
+                if not allowed.any():
+                    continue
+                y = log_q if b == 0.0 else np.exp(-b * log_q)
+                qi, di = self._linearFit(t, y, log_q, mask, n_points, b)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    log_q_hat = np.log(self.rate(qi[:, None], di[:, None], b, t))
+                sse = np.where(mask, (log_q - log_q_hat) ** 2, 0.0).sum(axis=1)
+                better = allowed & np.isfinite(sse) & (sse < best["sse"])
+                best["qi"] = np.where(better, qi, best["qi"])
+                best["di"] = np.where(better, di, best["di"])
+                best["b"] = np.where(better, b, best["b"])
+                best["sse"] = np.where(better, sse, best["sse"])
+            for key in ("qi", "di", "b", "sse"):
+                dict_fit[key][start:stop] = np.where(n_points >= 2, best[key], np.nan)
+            dict_fit["n_points"][start:stop] = n_points
+        return dict_fit
+
+    def _linearFit(self, t, y, log_q, mask, n_points, b):
+        # Masked closed-form regression y = intercept + slope * t for every row at once
+        w = mask.astype(float)
+        n = np.maximum(n_points, 1)
+        sum_t, sum_y = (w * t).sum(axis=1), (w * y).sum(axis=1)
+        sum_tt, sum_ty = (w * t * t).sum(axis=1), (w * t * y).sum(axis=1)
+        denom = n * sum_tt - sum_t ** 2
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            slope = np.where(np.abs(denom) > 1e-12, (n * sum_ty - sum_t * sum_y) / denom, 0.0)
+            intercept = (sum_y - slope * sum_t) / n
+            if b == 0.0:
+                qi, d_day = np.exp(intercept), -slope
+            else:
+                qi = np.where(intercept > 0, intercept ** (-1.0 / b), np.nan)
+                d_day = slope / (intercept * b)
+        # Inclining wells are held flat at their geometric mean rate
+        is_incline = ~(d_day >= 0)
+        qi = np.where(is_incline, np.exp((w * log_q).sum(axis=1) / n), qi)
+        d_day = np.where(is_incline, 0.0, d_day)
+        return qi, d_day * self.DAYS_PER_YEAR
+
+    def forecastMatrix(self, q_start, di_start, b, start_dates, anchor_dates, int_months: int,
+                       abandonment=0.0):
+        """
+        {
+        "description": "Monthly forecast of many wells in one pass. Each well declines from q_start/di_start at its anchor date; forecast rows start at its start date and step one calendar month",
+        "arguments": {
+            "q_start": "array, rate at the anchor date",
+            "di_start": "array, nominal 1/year at the anchor date",
+            "b": "array",
+            "start_dates": "array-like of YYYY-MM-DD",
+            "anchor_dates": "array-like of YYYY-MM-DD",
+            "int_months": 420,
+            "abandonment": "float or array, rate below which production stops"
+            },
+        "return": {"dates": "datetime64[D] (wells, months)", "rates": "(wells, months), 0 after abandonment", "volumes": "(wells, months)", "alive": "bool (wells, months)"}
+        }
+        """
+        dates, tau = self._monthGrid(start_dates, anchor_dates, int_months)
+        dict_forecast = self._declineMatrix(q_start, di_start, b, tau, abandonment)
+        dict_forecast["dates"] = dates[:, :-1]
+        return dict_forecast
+
+    @staticmethod
+    def _monthGrid(start_dates, anchor_dates, int_months):
+        # Monthly dates keeping the day of the start date (clipped to the month length) and their days from the anchor
+        start = np.asarray(pd.to_datetime(pd.Series(start_dates)).to_numpy(), dtype="datetime64[D]")
+        anchor = np.asarray(pd.to_datetime(pd.Series(anchor_dates)).to_numpy(), dtype="datetime64[D]")
+        start_month = start.astype("datetime64[M]")
+        day_offset = (start - start_month.astype("datetime64[D]")).astype(int)
+        months = start_month[:, None] + np.arange(int_months + 1)[None, :]
+        month_first = months.astype("datetime64[D]")
+        month_length = ((months + 1).astype("datetime64[D]") - month_first).astype(int)
+        dates = month_first + np.minimum(day_offset[:, None], month_length - 1).astype("timedelta64[D]")
+        return dates, (dates - anchor[:, None]).astype(float)
+
+    @classmethod
+    def _declineMatrix(cls, q_start, di_start, b, tau, abandonment=0.0):
+        """
+        Rates at the first tau points and volumes between consecutive tau points, tau on the last axis and the
+        parameters broadcasting against tau[..., 0]. One log1p/exp/expm1 per cell covers every b: b is kept off
+        0 and 1 by 1e-12, where the hyperbola matches the exponential and harmonic forms to about 1e-8
+        """
+        q_start = np.asarray(q_start, dtype=float)[..., None]
+        b = np.asarray(b, dtype=float)[..., None]
+        b = np.where(np.abs(b - 1.0) < 1e-12, 1.0 - 1e-12, np.maximum(b, 1e-12))
+        d = np.maximum(np.asarray(di_start, dtype=float)[..., None] / cls.DAYS_PER_YEAR, 1e-15)
+        abandonment = np.asarray(abandonment, dtype=float)[..., None]
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            log_base = np.log1p(np.maximum(b * d * tau, -1.0 + 1e-12))
+            rates = q_start * np.exp(-log_base[..., :-1] / b)
+            cum = q_start * np.expm1(log_base * ((b - 1.0) / b)) / ((b - 1.0) * d)
+        volumes = np.diff(cum, axis=-1)
+        # Rates never increase along tau, so once a month falls below abandonment production stops for good
+        alive = (rates >= abandonment) & (rates > 0)
+        return {
+            "rates": np.where(alive, rates, 0.0),
+            "volumes": np.where(alive, volumes, 0.0),
+            "alive": alive,
+        }
+
+    @classmethod
+    def _declineMatrixInPlace(cls, q_start, di_start, b, tau, abandonment=0.0):
+        """
+        _declineMatrix with at most three cell-sized float arrays alive at once (the log base, reused for the
+        rates, the cumulative and the volumes), for the large Monte Carlo blocks. Returns (rates, volumes)
+        """
+        q_start = np.asarray(q_start, dtype=float)[..., None]
+        b = np.asarray(b, dtype=float)[..., None]
+        b = np.where(np.abs(b - 1.0) < 1e-12, 1.0 - 1e-12, np.maximum(b, 1e-12))
+        d = np.maximum(np.asarray(di_start, dtype=float)[..., None] / cls.DAYS_PER_YEAR, 1e-15)
+        abandonment = np.asarray(abandonment, dtype=float)[..., None]
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            log_base = np.multiply(b * d, tau)
+            np.maximum(log_base, -1.0 + 1e-12, out=log_base)
+            np.log1p(log_base, out=log_base)
+            cum = np.multiply(log_base, (b - 1.0) / b)
+            np.expm1(cum, out=cum)
+            cum *= q_start / ((b - 1.0) * d)
+            volumes = np.subtract(cum[..., 1:], cum[..., :-1])
+            del cum
+            rates = log_base[..., :-1]
+            rates /= -b
+            np.exp(rates, out=rates)
+            rates *= q_start
+        is_dead = ~((rates >= abandonment) & (rates > 0))
+        np.copyto(rates, 0.0, where=is_dead)
+        np.copyto(volumes, 0.0, where=is_dead)
+        return rates, volumes
+
+    def forecastWells(self, qi, di, b, start_dates, int_months: int = 420, abandonment=0.0, anchor_dates=None,
+                      cum_production=None):
+        """
+        {
+        "description": "Wells x months forecast matrix of many wells in one pass, with remaining reserves and EUR. qi/di are the rate and nominal decline at the anchor date (the start date when no anchor is given); remaining reserves are the volumes from the start date to abandonment or the end of the horizon",
+        "arguments": {
+            "qi": "array, daily rate at the anchor",
+            "di": "array, nominal 1/year at the anchor",
+            "b": "array",
+            "start_dates": "array-like of YYYY-MM-DD",
+            "int_months": 420,
+            "abandonment": "float or array",
+            "anchor_dates": "None | array-like of YYYY-MM-DD",
+            "cum_production": "None | array, produced volume up to the start date"
+            },
+        "return": {"dates", "rates", "volumes", "alive", "remaining_reserves": "array", "eur": "array", "months_to_abandonment": "array"}
+        }
+        """
+        anchor_dates = start_dates if anchor_dates is None else anchor_dates
+        qi = np.nan_to_num(np.asarray(qi, dtype=float))
+        di = np.nan_to_num(np.asarray(di, dtype=float))
+        b = np.nan_to_num(np.asarray(b, dtype=float))
+        dict_forecast = self.forecastMatrix(qi, di, b, start_dates, anchor_dates, int_months, abandonment)
+        remaining = dict_forecast["volumes"].sum(axis=1)
+        cum_production = np.zeros(len(qi)) if cum_production is None else \
+            np.nan_to_num(np.asarray(cum_production, dtype=float))
+        dict_forecast["remaining_reserves"] = remaining
+        dict_forecast["eur"] = cum_production + remaining
+        dict_forecast["months_to_abandonment"] = dict_forecast["alive"].sum(axis=1)
+        return dict_forecast
+
+    def monteCarlo(self, qi, di, b, start_dates, int_months: int = 420, abandonment=0.0, anchor_dates=None,
+                   int_realizations: int = 1000, qi_sigma=0.1, di_sigma=0.2, b_sigma=0.2, float_b_max: float = 2.0,
+                   percentiles=(10, 50, 90), int_max_cells: int = 2000000, seed=None):
+        """
+        {
+        "description": "Probabilistic forecast of many wells. qi and di are sampled lognormal around the deterministic values (sigma of the log), b normal and clipped to [0, float_b_max]; sigmas are floats or per-well arrays. Wells are processed in chunks so that wells x realizations x months stays under int_max_cells; a chunk keeps at most three float arrays of that size, so the working memory is about 24 bytes x int_max_cells (48 MB at the default) plus the realizations x calendar months portfolio. Percentiles follow the exceedance convention (P10 is the high case). The portfolio adds the wells realization by realization on a common monthly calendar, assuming independent wells",
+        "arguments": {
+            "qi, di, b, start_dates, int_months, abandonment, anchor_dates": "as in forecastWells",
+            "int_realizations": 1000,
+            "qi_sigma": 0.1, "di_sigma": 0.2, "b_sigma": 0.2,
+            "percentiles": [10, 50, 90],
+            "int_max_cells": "2000000, cells per chunk array",
+            "seed": "None | int"
+            },
+        "return": {
+            "dates": "datetime64[D] (wells, months)",
+            "rates": "{'P10': (wells, months)}",
+            "reserves": "{'P10': (wells,)}",
+            "reserves_mean": "(wells,)",
+            "portfolio": {"dates": "datetime64[M] (calendar months)", "volumes": "{'P10': (calendar months,)}", "reserves": "{'P10': float}"}
+            }
+        }
+        """
+        qi = np.nan_to_num(np.asarray(qi, dtype=float))
+        di = np.nan_to_num(np.asarray(di, dtype=float))
+        b = np.nan_to_num(np.asarray(b, dtype=float))
+        int_wells = len(qi)
+        anchor_dates = start_dates if anchor_dates is None else anchor_dates
+        dates, tau = self._monthGrid(start_dates, anchor_dates, int_months)
+        abandonment = np.broadcast_to(np.asarray(abandonment, dtype=float), (int_wells,))
+        sigmas = [np.broadcast_to(np.asarray(x, dtype=float), (int_wells,)) for x in (qi_sigma, di_sigma, b_sigma)]
+        labels = [f"P{p}" for p in percentiles]
+        rng = np.random.default_rng(seed)
+
+        start_month = dates[:, 0].astype("datetime64[M]")
+        first_month = start_month.min() if int_wells else np.datetime64("today", "M")
+        offsets = (start_month - first_month).astype(int)
+        int_calendar = int(offsets.max()) + int_months if int_wells else int_months
+        portfolio = np.zeros((int_realizations, int_calendar))
+        dict_result = {
+            "dates": dates[:, :-1],
+            "rates": {label: np.zeros((int_wells, int_months)) for label in labels},
+            "reserves": {label: np.zeros(int_wells) for label in labels},
+            "reserves_mean": np.zeros(int_wells),
+        }
+        int_chunk = max(1, int_max_cells // max(1, int_realizations * (int_months + 1)))
+        for first in range(0, int_wells, int_chunk):
+            last = min(first + int_chunk, int_wells)
+            # Realizations on axis 1, the month grid of each well is shared by all its realizations
+            wells = slice(first, last)
+            z = rng.standard_normal((3, last - first, int_realizations))
+            qi_r = qi[wells, None] * np.exp(sigmas[0][wells, None] * z[0])
+            di_r = di[wells, None] * np.exp(sigmas[1][wells, None] * z[1])
+            b_r = np.clip(b[wells, None] + sigmas[2][wells, None] * z[2], 0.0, float_b_max)
+            rates, volumes = self._declineMatrixInPlace(qi_r, di_r, b_r, tau[wells, None, :], abandonment[wells, None])
+            reserves = volumes.sum(axis=2)
+            exceedance = [100 - p for p in percentiles]
+            # rates are not needed afterwards, so the percentile partitions them in place instead of copying
+            rates_pct = np.percentile(rates, exceedance, axis=1, overwrite_input=True)
+            del rates
+            reserves_pct = np.percentile(reserves, exceedance, axis=1)
+            for n, label in enumerate(labels):
+                dict_result["rates"][label][first:last] = rates_pct[n]
+                dict_result["reserves"][label][first:last] = reserves_pct[n]
+            dict_result["reserves_mean"][first:last] = reserves.mean(axis=1)
+            for row, n in enumerate(range(first, last)):
+                portfolio[:, offsets[n]:offsets[n] + int_months] += volumes[row]
+        dict_result["portfolio"] = {
+            "dates": first_month + np.arange(int_calendar),
+            "volumes": dict(zip(labels, np.percentile(portfolio, [100 - p for p in percentiles], axis=0))),
+            "reserves": {label: float(np.percentile(portfolio.sum(axis=1), 100 - p))
+                         for label, p in zip(labels, percentiles)},
+        }
+        return dict_result
+
+    def fitForecast(self, list_templates: list):
+        """
+        {
+        "description": "Fit and forecast a list of fit_forecast templates in one batch, returning fit_forecast-compatible dicts",
+        "arguments": [{"x_selected", "y_selected", "arps_type", "primary_phase_forecast_rate", "forecast_months", "primary_forecast_date", "primary_forecast_last_date", "primary_phase_abandonment", "fc_rate_choice"}],
+        "return": [{"primary_phase_beta", "primary_phase_decline", "primary_phase_initial_rate", "fit", "time_fit", "forecast", "time_forecast", "primary_phase_reserves", "gas_reserves", "water_reserves"}]
+        }
+        """
+        if not list_templates:
+            return []
+        list_dates = [np.asarray(x["x_selected"], dtype="datetime64[D]") for x in list_templates]
+        list_t_days = [(x - x[0]).astype(float) if len(x) else np.array([]) for x in list_dates]
+        dict_fit = self.fit(list_t_days, [x["y_selected"] for x in list_templates],
+                            [x.get("arps_type", "HYPE") for x in list_templates])
+        qi, di, b = dict_fit["qi"], dict_fit["di"], dict_fit["b"]
+
+        first_dates = np.array([x[0] if len(x) else np.datetime64("NaT") for x in list_dates], dtype="datetime64[D]")
+        anchor_dates = np.array([x.get("primary_forecast_last_date") or str(d[-1]) for x, d in
+                                 zip(list_templates, list_dates)], dtype="datetime64[D]")
+        t_anchor = (anchor_dates - first_dates).astype(float)
+        q_fit_anchor = self.rate(qi, di, b, t_anchor)
+        # Instantaneous nominal decline at the anchor, so the forecast continues the fitted curve
+        with np.errstate(invalid="ignore", divide="ignore"):
+            di_anchor = di / (1.0 + b * di / self.DAYS_PER_YEAR * t_anchor)
+        use_last_value = np.array([x.get("fc_rate_choice") == "LASTVAL" for x in list_templates])
+        q_last = np.array([x.get("primary_phase_forecast_rate") or np.nan for x in list_templates], dtype=float)
+        q_start = np.where(use_last_value & np.isfinite(q_last), q_last, q_fit_anchor)
+        start_dates = [x.get("primary_forecast_date") or str(a) for x, a in zip(list_templates, anchor_dates)]
+        int_months = int(max(float(x.get("forecast_months") or 420.0) for x in list_templates))
+        abandonment = np.array([float(x.get("primary_phase_abandonment") or 0.0) for x in list_templates])
+        is_valid = np.isfinite(qi) & np.isfinite(di)
+        dict_forecast = self.forecastMatrix(np.where(is_valid, q_start, 0.0), np.where(is_valid, di_anchor, 0.0),
+                                            np.where(is_valid, b, 0.0), start_dates, anchor_dates, int_months,
+                                            abandonment)
+
+        int_len = max(len(x) for x in list_t_days)
+        t_fit = np.zeros((len(list_t_days), int_len))
+        for n, t_days in enumerate(list_t_days):
+            t_fit[n, :len(t_days)] = t_days
+        rates_fit = self.rate(qi[:, None], di[:, None], b[:, None], t_fit)
+        dict_time_forecast = {}
+
+        list_results = []
+        for n, template in enumerate(list_templates):
+            if not is_valid[n]:
+                list_results.append({"error": "Not enough positive rates to fit", "primary_phase_beta": None,
+                                     "primary_phase_decline": None, "forecast": [], "time_forecast": [],
+                                     "primary_phase_reserves": None, "gas_reserves": None, "water_reserves": None})
+                continue
+            int_well_months = min(int(float(template.get("forecast_months") or 420.0)), int_months)
+            alive = dict_forecast["alive"][n, :int_well_months]
+            int_alive = int(alive.sum())
+            # Wells sharing a forecast start date share the same month grid
+            if start_dates[n] not in dict_time_forecast:
+                dict_time_forecast[start_dates[n]] = np.datetime_as_string(dict_forecast["dates"][n]).tolist()
+            list_results.append({
+                "arps_type": template.get("arps_type", "HYPE"),
+                "primary_phase_beta": float(b[n]),
+                "primary_phase_decline": float(di[n]),
+                "primary_phase_initial_rate": float(qi[n]),
+                "fit": rates_fit[n, :len(list_t_days[n])].tolist(),
+                "time_fit": list(template["x_selected"]),
+                "forecast": dict_forecast["rates"][n, :int_alive].tolist(),
+                "time_forecast": dict_time_forecast[start_dates[n]][:int_alive],
+                "primary_phase_reserves": float(dict_forecast["volumes"][n, :int_well_months].sum()),
+                "gas_reserves": None,
+                "water_reserves": None,
+            })
+        return list_results
+
+
+class EconomicsEngine:
+    """
+    In-process economics for many scenarios at once, on a common monthly calendar.
+
+    Scenarios are rows of (scenarios, months) arrays: volumes, prices and costs broadcast against each other, so
+    one forecast can be evaluated under many price decks or multipliers without copying it. Net values apply the
+    working interest and royalties, costs escalate with the yearly inflation rate, and cash flows are discounted
+    monthly with (1 + rate) ** (month / 12), the first month undiscounted. Output names follow economicforecastcase.
+    """
+    OPEX_FIXED_COLUMNS = ("operating_g_a", "fixed_opex", "fixed_opex_1", "fixed_opex_2", "fixed_opex_3", "workovers")
+    OPEX_TARIFF_COLUMNS = ("transport_tariff", "process_tariff")
+
+    @staticmethod
+    def calendar(dates):
+        """
+        First-of-month datetime64[M] calendar covering the given dates.
+        """
+        months = np.asarray(pd.to_datetime(pd.Series(dates)).to_numpy(), dtype="datetime64[M]")
+        return np.arange(months.min(), months.max() + 1)
+
+    @staticmethod
+    def alignStep(df, months, columns, str_date_col="date"):
+        """
+        Dated values held until the next date (price decks, opex schedules) on the calendar: (months, columns).
+        Months before the first date take the first value, missing columns are 0.
+        """
+        if df is None or len(df) == 0:
+            return np.zeros((len(months), len(columns)))
+        df1 = df.copy()
+        df1["_month"] = np.asarray(pd.to_datetime(df1[str_date_col]).to_numpy(), dtype="datetime64[M]")
+        df1 = df1.sort_values("_month").drop_duplicates("_month", keep="last")
+        position = np.clip(np.searchsorted(df1["_month"].to_numpy(), months, side="right") - 1, 0, None)
+        values = np.column_stack([pd.to_numeric(df1[col], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+                                  if col in df1 else np.zeros(len(df1)) for col in columns])
+        return values[position]
+
+    @staticmethod
+    def alignSum(df, months, columns, str_date_col="date"):
+        """
+        Dated amounts (capex) summed per calendar month: (months,). Dates outside the calendar are dropped.
+        """
+        total = np.zeros(len(months))
+        if df is None or len(df) == 0:
+            return total
+        df_month = np.asarray(pd.to_datetime(df[str_date_col]).to_numpy(), dtype="datetime64[M]")
+        position = (df_month - months[0]).astype(int)
+        amount = np.zeros(len(df))
+        for col in columns:
+            if col in df:
+                amount += pd.to_numeric(df[col], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+        is_inside = (position >= 0) & (position < len(months))
+        np.add.at(total, position[is_inside], amount[is_inside])
+        return total
+
+    def cashFlow(self, oil, gas, wat, oil_price, gas_price, capex=0.0, fixed_opex=0.0, tariff=0.0,
+                 variable_opex_oil=0.0, variable_opex_gas=0.0, variable_opex_water=0.0, variable_opex_fluid=0.0,
+                 tariff_revenue=0.0, royalty_oil=0.0, royalty_gas=0.0, working_interest=1.0, inflation_rate=0.0,
+                 abandonment_cost=0.0, price_mult=1.0, opex_mult=1.0, capex_mult=1.0, volume_mult=1.0):
+        """
+        {
+        "description": "Monthly cash flow of every scenario. Volumes and monthly series are (scenarios or 1, months) arrays, unit costs and multipliers scalars or (scenarios,) arrays. Fixed opex is charged while the scenario produces; abandonment_cost is charged on its last producing month",
+        "return": {"oil", "gas", "wat", "total_revenue", "total_cost_variable", "total_cost_fixed", "opex", "capex", "abandonment_cost", "total_cost", "cash_flow": "(scenarios, months)"}
+        }
+        """
+        def _series(x):
+            return np.atleast_2d(np.asarray(x, dtype=float))
+
+        def _per_scenario(x):
+            x = np.asarray(x, dtype=float)
+            return x[:, None] if x.ndim == 1 else x
+
+        volume_mult, price_mult = _per_scenario(volume_mult), _per_scenario(price_mult)
+        opex_mult, capex_mult = _per_scenario(opex_mult), _per_scenario(capex_mult)
+        oil, gas, wat = (np.nan_to_num(_series(x)) * volume_mult for x in (oil, gas, wat))
+        int_months = max(x.shape[1] for x in (oil, gas, wat))
+        escalation = (1.0 + _per_scenario(inflation_rate)) ** (np.arange(int_months) / 12.0)
+        wi = _per_scenario(working_interest)
+        revenue = oil * _series(oil_price) * price_mult * (1.0 - _per_scenario(royalty_oil)) \
+            + gas * _series(gas_price) * price_mult * (1.0 - _per_scenario(royalty_gas)) + _series(tariff_revenue)
+        cost_variable = oil * (_per_scenario(variable_opex_oil) + _series(tariff)) \
+            + gas * _per_scenario(variable_opex_gas) + wat * _per_scenario(variable_opex_water) \
+            + (oil + wat) * _per_scenario(variable_opex_fluid)
+        is_producing = (oil + gas + wat) > 0
+        # Production ends at the last producing month; fixed costs stop and abandonment is paid there
+        int_last = int_months - 1 - np.argmax(is_producing[:, ::-1], axis=1)
+        has_production = is_producing.any(axis=1)
+        month_index = np.arange(int_months)[None, :]
+        is_active = (month_index <= int_last[:, None]) & has_production[:, None]
+        is_last = (month_index == int_last[:, None]) & has_production[:, None]
+        dict_cash = {
+            "oil": oil, "gas": gas, "wat": wat,
+            "total_revenue": revenue * wi,
+            "total_cost_variable": cost_variable * opex_mult * escalation * wi,
+            "total_cost_fixed": np.where(is_active, _series(fixed_opex), 0.0) * opex_mult * escalation * wi,
+            "capex": _series(capex) * capex_mult * escalation * wi,
+            "abandonment_cost": np.where(is_last, _per_scenario(abandonment_cost), 0.0) * capex_mult * escalation * wi,
+        }
+        dict_cash["opex"] = dict_cash["total_cost_variable"] + dict_cash["total_cost_fixed"]
+        dict_cash["total_cost"] = dict_cash["opex"] + dict_cash["capex"] + dict_cash["abandonment_cost"]
+        dict_cash["cash_flow"] = dict_cash["total_revenue"] - dict_cash["total_cost"]
+        shape = np.broadcast_shapes(*[np.shape(x) for x in dict_cash.values()])
+        return {key: np.broadcast_to(value, shape) for key, value in dict_cash.items()}
+
+    @staticmethod
+    def npv(cash_flow, discount_rates):
+        """
+        NPV of (scenarios, months) cash flows at every yearly discount rate: (scenarios, rates).
+        """
+        cash_flow = np.atleast_2d(np.asarray(cash_flow, dtype=float))
+        years = np.arange(cash_flow.shape[1]) / 12.0
+        factors = (1.0 + np.atleast_1d(np.asarray(discount_rates, dtype=float))[None, :]) ** (-years[:, None])
+        return cash_flow @ factors
+
+    @staticmethod
+    def _npvPerScenario(cash_flow_t, rates):
+        # One rate per scenario, Horner's scheme over the months of the (months, scenarios) cash flows
+        monthly_factor = (1.0 + rates) ** (-1.0 / 12.0)
+        result = np.zeros(cash_flow_t.shape[1])
+        for month_values in cash_flow_t[::-1]:
+            result = result * monthly_factor + month_values
+        return result
+
+    def irr(self, cash_flow, float_low: float = -0.99, float_high: float = 10.0, int_iterations: int = 50):
+        """
+        Yearly IRR of every scenario by vectorized bisection on [float_low, float_high]; NaN where NPV does not
+        change sign in that range (all-positive or all-negative cash flows).
+        """
+        cash_flow = np.ascontiguousarray(np.atleast_2d(np.asarray(cash_flow, dtype=float)).T)
+        int_scenarios = cash_flow.shape[1]
+        low = np.full(int_scenarios, float_low)
+        high = np.full(int_scenarios, float_high)
+        npv_low = self._npvPerScenario(cash_flow, low)
+        npv_high = self._npvPerScenario(cash_flow, high)
+        is_bracketed = np.sign(npv_low) != np.sign(npv_high)
+        for _ in range(int_iterations):
+            mid = (low + high) / 2.0
+            npv_mid = self._npvPerScenario(cash_flow, mid)
+            same_as_low = np.sign(npv_mid) == np.sign(npv_low)
+            low = np.where(same_as_low, mid, low)
+            npv_low = np.where(same_as_low, npv_mid, npv_low)
+            high = np.where(same_as_low, high, mid)
+        return np.where(is_bracketed, (low + high) / 2.0, np.nan)
+
+    def run(self, df_forecast, df_price, df_capex=None, df_opex=None, dict_opex=None, dict_economic=None,
+            dict_abandonment=None, list_discount_rates=None, str_scenario_col=None, dict_multipliers=None,
+            price_paths=None, bool_irr: bool = True):
+        """
+        {
+        "description": "Economics of columnar forecasts: builds the calendar, aligns price deck (step), capex (sum per month) and opex schedule (step) on it and evaluates every scenario at once. Scenarios are the groups of str_scenario_col in df_forecast, or the rows of dict_multipliers / price_paths applied to a single forecast",
+        "arguments": {
+            "df_forecast": "DataFrame[date, oil, gas, wat, (active_wells), (str_scenario_col)], monthly volumes",
+            "df_price": "pricecase rows DataFrame[date, oil, gas]",
+            "df_capex": "capexcase rows, every numeric column is an investment of that month",
+            "df_opex": "opexcase rows, fixed columns per month, tariffs per unit of oil, tariff_revenue",
+            "dict_opex": "opexmaster, variable_opex_oil / gas / water / fluid per unit",
+            "dict_economic": "economicmaster + economiccase values: discount_rate_yearly, inflation_rate_yearly, royalty_oil, royalty_gas, WI",
+            "dict_abandonment": "abandonmentmaster: abandonment_wells (per well) and abandonment_facilities",
+            "list_discount_rates": "[0.1] (default discount_rate_yearly)",
+            "dict_multipliers": "None | {'price_mult': array, 'opex_mult': array, 'capex_mult': array, 'volume_mult': array}",
+            "price_paths": "None | {'oil': (scenarios, months), 'gas': (scenarios, months)} replacing the deck",
+            "bool_irr": "False skips the IRR search (irr is None)"
+            },
+        "return": {"months": "datetime64[M] calendar", "scenarios": "list", "cash": "cashFlow arrays", "npv": "(scenarios, rates)", "irr": "(scenarios,)", "discount_rates": "list"}
+        }
+        """
+        dict_opex = dict_opex or {}
+        dict_economic = dict_economic or {}
+        dict_abandonment = dict_abandonment or {}
+        if list_discount_rates is None:
+            list_discount_rates = [float(dict_economic.get("discount_rate_yearly") or 0.1)]
+        months = self.calendar(df_forecast["date"])
+        forecast_month = np.asarray(pd.to_datetime(df_forecast["date"]).to_numpy(), dtype="datetime64[M]")
+        position = (forecast_month - months[0]).astype(int)
+        if str_scenario_col is not None:
+            scenario_codes, scenarios = pd.factorize(df_forecast[str_scenario_col])
+            scenarios = list(scenarios)
+        else:
+            scenario_codes, scenarios = np.zeros(len(df_forecast), dtype=int), [None]
+        dict_volumes = {}
+        for col in ("oil", "gas", "wat", "active_wells"):
+            volume = np.zeros((len(scenarios), len(months)))
+            if col in df_forecast:
+                values = pd.to_numeric(df_forecast[col], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+                if col == "active_wells":
+                    np.maximum.at(volume, (scenario_codes, position), values)
+                else:
+                    np.add.at(volume, (scenario_codes, position), values)
+            dict_volumes[col] = volume
+        prices = self.alignStep(df_price, months, ["oil", "gas"])
+        oil_price, gas_price = prices[:, 0], prices[:, 1]
+        if price_paths is not None:
+            oil_price = price_paths.get("oil", oil_price)
+            gas_price = price_paths.get("gas", gas_price)
+        capex_columns = [col for col in (df_capex.columns if df_capex is not None else [])
+                         if col not in ("date", "id", "capexmaster_fk") and pd.api.types.is_numeric_dtype(df_capex[col])]
+        opex_schedule = self.alignStep(df_opex, months, list(self.OPEX_FIXED_COLUMNS + self.OPEX_TARIFF_COLUMNS)
+                                       + ["tariff_revenue"])
+        int_fixed = len(self.OPEX_FIXED_COLUMNS)
+        int_wells = np.maximum(dict_volumes["active_wells"].max(axis=1), 1.0)
+        abandonment_cost = float(dict_abandonment.get("abandonment_wells") or 0.0) * int_wells \
+            + float(dict_abandonment.get("abandonment_facilities") or 0.0)
+        dict_multipliers = dict_multipliers or {}
+        dict_cash = self.cashFlow(
+            dict_volumes["oil"], dict_volumes["gas"], dict_volumes["wat"], oil_price, gas_price,
+            capex=self.alignSum(df_capex, months, capex_columns),
+            fixed_opex=opex_schedule[:, :int_fixed].sum(axis=1),
+            tariff=opex_schedule[:, int_fixed:int_fixed + len(self.OPEX_TARIFF_COLUMNS)].sum(axis=1),
+            tariff_revenue=opex_schedule[:, -1],
+            variable_opex_oil=float(dict_opex.get("variable_opex_oil") or 0.0),
+            variable_opex_gas=float(dict_opex.get("variable_opex_gas") or 0.0),
+            variable_opex_water=float(dict_opex.get("variable_opex_water") or 0.0),
+            variable_opex_fluid=float(dict_opex.get("variable_opex_fluid") or 0.0),
+            royalty_oil=float(dict_economic.get("royalty_oil") or 0.0),
+            royalty_gas=float(dict_economic.get("royalty_gas") or 0.0),
+            working_interest=float(dict_economic.get("WI") if dict_economic.get("WI") is not None else 1.0),
+            inflation_rate=float(dict_economic.get("inflation_rate_yearly") or 0.0),
+            abandonment_cost=abandonment_cost, **dict_multipliers)
+        dict_cash["active_wells"] = dict_volumes["active_wells"]
+        int_scenarios = dict_cash["cash_flow"].shape[0]
+        if len(scenarios) != int_scenarios:
+            scenarios = list(range(int_scenarios))
+        return {
+            "months": months,
+            "scenarios": scenarios,
+            "cash": dict_cash,
+            "discount_rates": list(list_discount_rates),
+            "npv": self.npv(dict_cash["cash_flow"], list_discount_rates),
+            "irr": self.irr(dict_cash["cash_flow"]) if bool_irr else None,
+        }
+
+    def toFrames(self, dict_run, str_scenario_col="scenario"):
+        """
+        Long economicforecastcase-shaped cash flow table and one summary row per scenario (npv_<rate>, irr).
+        """
+        months, scenarios = dict_run["months"], dict_run["scenarios"]
+        int_scenarios, int_months = dict_run["cash"]["cash_flow"].shape
+        df_cashflow = pd.DataFrame({
+            str_scenario_col: np.repeat(np.asarray(scenarios, dtype=object), int_months),
+            "date": np.tile(months.astype("datetime64[D]"), int_scenarios),
+        })
+        for col in ("oil", "wat", "gas", "active_wells", "opex", "capex", "abandonment_cost", "total_cost_variable",
+                    "total_cost_fixed", "total_cost", "total_revenue", "cash_flow"):
+            df_cashflow[col] = np.broadcast_to(dict_run["cash"][col], (int_scenarios, int_months)).ravel()
+        df_summary = pd.DataFrame({str_scenario_col: scenarios})
+        for n, rate in enumerate(dict_run["discount_rates"]):
+            df_summary[f"npv_{rate:g}"] = dict_run["npv"][:, n]
+        df_summary["irr"] = dict_run["irr"]
+        df_summary["total_revenue"] = dict_run["cash"]["total_revenue"].sum(axis=1)
+        df_summary["total_cost"] = dict_run["cash"]["total_cost"].sum(axis=1)
+        df_summary["cash_flow"] = dict_run["cash"]["cash_flow"].sum(axis=1)
+        return df_cashflow, df_summary
+
+    def monteCarlo(self, df_forecast, df_price, df_capex=None, df_opex=None, dict_opex=None, dict_economic=None,
+                   dict_abandonment=None, list_discount_rates=None, str_scenario_col=None,
+                   int_realizations: int = 1000, price_sigma: float = 0.25, float_price_correlation: float = 0.8,
+                   capex_sigma: float = 0.15, opex_sigma: float = 0.1, volume_sigma: float = 0.0,
+                   percentiles=(10, 50, 90), int_chunk: int = 1000, seed=None):
+        """
+        {
+        "description": "Stochastic economics of one or many forecasts. Oil and gas prices follow correlated geometric Brownian motions around the deck (mean preserving, price_sigma is the yearly volatility, the first month is the deck); capex, opex and volume multipliers are lognormal with mean 1. Realizations are evaluated int_chunk at a time and every forecast sees the same random draws. Percentiles follow the exceedance convention (P10 is the high case)",
+        "return": {"forecasts": "list", "discount_rates": "list", "percentiles": "list", "results": "per forecast {'months', 'npv': (realizations, rates), 'cash_flow_percentiles': (percentiles, months), 'cash_flow_mean': (months,)}"}
+        }
+        """
+        dict_economic = dict_economic or {}
+        if list_discount_rates is None:
+            list_discount_rates = [float(dict_economic.get("discount_rate_yearly") or 0.1)]
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % (2 ** 63))
+        if str_scenario_col is not None:
+            list_forecasts = list(pd.unique(df_forecast[str_scenario_col]))
+        else:
+            list_forecasts = [None]
+        float_mix = np.sqrt(max(1.0 - float_price_correlation ** 2, 0.0))
+        list_results = []
+        for forecast in list_forecasts:
+            df_one = df_forecast if forecast is None else df_forecast[df_forecast[str_scenario_col] == forecast]
+            months = self.calendar(df_one["date"])
+            int_months = len(months)
+            deck = self.alignStep(df_price, months, ["oil", "gas"])
+            drift = 0.5 * price_sigma ** 2 * np.arange(int_months) / 12.0
+            # Same seed per forecast: common random numbers make forecasts comparable
+            rng = np.random.default_rng(seed)
+            list_npv, list_cash_flow = [], []
+            for int_start in range(0, int_realizations, int_chunk):
+                int_size = min(int_chunk, int_realizations - int_start)
+                z_oil = rng.standard_normal((int_size, int_months))
+                z_gas = float_price_correlation * z_oil + float_mix * rng.standard_normal((int_size, int_months))
+                dict_paths = {}
+                for phase, z, n in (("oil", z_oil, 0), ("gas", z_gas, 1)):
+                    z[:, 0] = 0.0
+                    walk = np.cumsum(z, axis=1) * (price_sigma / np.sqrt(12.0))
+                    dict_paths[phase] = deck[:, n][None, :] * np.exp(walk - drift[None, :])
+                dict_multipliers = {
+                    key: np.exp(sigma * rng.standard_normal(int_size) - 0.5 * sigma ** 2)
+                    for key, sigma in (("capex_mult", capex_sigma), ("opex_mult", opex_sigma),
+                                       ("volume_mult", volume_sigma))
+                }
+                dict_run = self.run(df_one, df_price, df_capex, df_opex, dict_opex, dict_economic, dict_abandonment,
+                                    list_discount_rates, None, dict_multipliers, dict_paths, bool_irr=False)
+                list_npv.append(dict_run["npv"])
+                list_cash_flow.append(np.array(dict_run["cash"]["cash_flow"], dtype=np.float32))
+            cash_flow = np.concatenate(list_cash_flow)
+            list_results.append({
+                "months": months,
+                "npv": np.concatenate(list_npv),
+                "cash_flow_percentiles": np.percentile(cash_flow, [100 - p for p in percentiles], axis=0),
+                "cash_flow_mean": cash_flow.mean(axis=0, dtype=float),
+            })
+        return {
+            "forecasts": list_forecasts,
+            "discount_rates": list(list_discount_rates),
+            "percentiles": list(percentiles),
+            "results": list_results,
+        }
+
+
+class WellSpatialIndex:
+    """
+    Local spatial index over wellmaster coordinates for radius and k-nearest queries.
+
+    Latitude/longitude are projected on a sphere (3D chord distance, exact for great-circle radius checks)
+    or utm_x/utm_y are used as planar coordinates. Points are kept sorted by their first coordinate so a
+    radius query only measures wells inside the slab [x - r, x + r]; k-nearest queries are blocked brute force.
+    Distances are returned in metres (great-circle for lat/lon).
+    """
+    EARTH_RADIUS = 6371008.8
+
+    def __init__(self, list_wells: list, use_utm: bool = False, int_block_size: int = 1024):
+        df_wells = pd.DataFrame(list_wells)
+        cols = ["utm_x", "utm_y"] if use_utm else ["latitude", "longitude"]
+        for col in cols:
+            df_wells[col] = pd.to_numeric(df_wells[col], errors="coerce")
+        int_missing = int(df_wells[cols].isna().any(axis=1).sum())
+        if int_missing:
+            print(f"{int_missing} wells without {cols[0]}/{cols[1]} left out of the index")
+        df_wells = df_wells.dropna(subset=cols).reset_index(drop=True)
+        self.use_utm = use_utm
+        self.int_block_size = int_block_size
+        if use_utm:
+            xyz = np.column_stack([df_wells["utm_x"].to_numpy(), df_wells["utm_y"].to_numpy(),
+                                   np.zeros(len(df_wells))])
+        else:
+            lat = np.radians(df_wells["latitude"].to_numpy())
+            lon = np.radians(df_wells["longitude"].to_numpy())
+            xyz = self.EARTH_RADIUS * np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon),
+                                                       np.sin(lat)])
+        order = np.argsort(xyz[:, 0], kind="stable")
+        self.df_wells = df_wells.iloc[order].reset_index(drop=True)
+        self.xyz = xyz[order]
+        self.well_names = self.df_wells["well_name"].to_numpy()
+        self.dict_position = {name: n for n, name in enumerate(self.well_names)}
+
+    def __len__(self):
+        return len(self.well_names)
+
+    def _chord(self, float_radius):
+        if self.use_utm:
+            return float_radius
+        return 2 * self.EARTH_RADIUS * np.sin(min(float_radius / (2 * self.EARTH_RADIUS), np.pi / 2))
+
+    def _arc(self, chord):
+        if self.use_utm:
+            return chord
+        return 2 * self.EARTH_RADIUS * np.arcsin(np.clip(chord / (2 * self.EARTH_RADIUS), 0.0, 1.0))
+
+    def _positions(self, well_names=None):
+        if well_names is None:
+            return np.arange(len(self.well_names))
+        if isinstance(well_names, str):
+            well_names = [well_names]
+        missing = [x for x in well_names if x not in self.dict_position]
+        if missing:
+            raise ValueError(f"Wells not in the spatial index: {missing}")
+        return np.array([self.dict_position[x] for x in well_names], dtype=int)
+
+    def _pairs(self, rows, cols, distances):
+        return pd.DataFrame({
+            "reference_well_name": self.well_names[rows],
+            "well_name": self.well_names[cols],
+            "distance": distances,
+        })
+
+    def queryRadius(self, well_names=None, float_radius: float = 1000.0):
+        """
+        {
+        "description": "Neighbours within float_radius metres of each well (all wells when well_names is None), the well itself excluded",
+        "arguments" : {
+            "well_names": ["Well A"],
+            "float_radius": 1000.0
+            },
+        "return": "DataFrame[reference_well_name, well_name, distance]"
+        }
+        """
+        positions = self._positions(well_names)
+        chord = self._chord(float_radius)
+        x_sorted = self.xyz[:, 0]
+        lower = np.searchsorted(x_sorted, self.xyz[positions, 0] - chord, side="left")
+        upper = np.searchsorted(x_sorted, self.xyz[positions, 0] + chord, side="right")
+        list_rows, list_cols, list_dist = [], [], []
+        for pos, lo, hi in zip(positions, lower, upper):
+            cand = np.arange(lo, hi)
+            dist = np.sqrt(((self.xyz[cand] - self.xyz[pos]) ** 2).sum(axis=1))
+            keep = (dist <= chord) & (cand != pos)
+            list_rows.append(np.full(int(keep.sum()), pos))
+            list_cols.append(cand[keep])
+            list_dist.append(dist[keep])
+        if not list_rows:
+            return self._pairs(np.array([], dtype=int), np.array([], dtype=int), np.array([]))
+        df_pairs = self._pairs(np.concatenate(list_rows), np.concatenate(list_cols),
+                               self._arc(np.concatenate(list_dist)))
+        return df_pairs.sort_values(["reference_well_name", "distance"]).reset_index(drop=True)
+
+    def proximityMatrix(self, float_radius: float = 1000.0):
+        """
+        {
+        "description": "All-pairs neighbours within float_radius metres as a symmetric sparse adjacency in CSR layout. Pairs are measured in int_block_size x int_block_size tiles inside the sorted slab so memory stays bounded for large fields",
+        "arguments" : {
+            "float_radius": 1000.0
+            },
+        "return": {
+            "well_names": "array, row/column labels",
+            "indptr": "array, neighbours of row i are indices[indptr[i]:indptr[i+1]]",
+            "indices": "array",
+            "distances": "array, metres, ascending within each row"
+            }
+        }
+        """
+        chord2 = self._chord(float_radius) ** 2
+        x_sorted = self.xyz[:, 0]
+        int_wells = len(self.well_names)
+        int_block = self.int_block_size
+        list_rows, list_cols, list_dist = [], [], []
+        for start in range(0, int_wells, int_block):
+            stop = min(start + int_block, int_wells)
+            upper = np.searchsorted(x_sorted, x_sorted[stop - 1] + np.sqrt(chord2), side="right")
+            rows_global = np.arange(start, stop)
+            for cand_start in range(start, upper, int_block):
+                cand_stop = min(cand_start + int_block, upper)
+                dist2 = np.zeros((stop - start, cand_stop - cand_start))
+                for axis in range(3):
+                    dist2 += (self.xyz[start:stop, axis][:, None] - self.xyz[cand_start:cand_stop, axis][None, :]) ** 2
+                cols_global = np.arange(cand_start, cand_stop)
+                # Upper triangle only, the matrix is mirrored below
+                keep = (dist2 <= chord2) & (cols_global[None, :] > rows_global[:, None])
+                i_local, j_local = np.nonzero(keep)
+                list_rows.append(rows_global[i_local])
+                list_cols.append(cols_global[j_local])
+                list_dist.append(np.sqrt(dist2[i_local, j_local]))
+        rows = np.concatenate(list_rows) if list_rows else np.array([], dtype=int)
+        cols = np.concatenate(list_cols) if list_cols else np.array([], dtype=int)
+        dist = self._arc(np.concatenate(list_dist)) if list_dist else np.array([])
+        rows, cols, dist = np.concatenate([rows, cols]), np.concatenate([cols, rows]), np.concatenate([dist, dist])
+        order = np.lexsort((dist, rows))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=int_wells))])
+        return {
+            "well_names": self.well_names,
+            "indptr": indptr,
+            "indices": cols[order],
+            "distances": dist[order],
+        }
+
+    def queryNearest(self, well_names=None, int_k: int = 5):
+        """
+        {
+        "description": "The int_k nearest wells of each well (all wells when well_names is None), the well itself excluded",
+        "arguments" : {
+            "well_names": ["Well A"],
+            "int_k": 5
+            },
+        "return": "DataFrame[reference_well_name, well_name, distance, rank]"
+        }
+        """
+        positions = self._positions(well_names)
+        int_k = min(int_k, len(self.well_names) - 1)
+        if int_k <= 0 or len(positions) == 0:
+            df_pairs = self._pairs(np.array([], dtype=int), np.array([], dtype=int), np.array([]))
+            df_pairs["rank"] = np.array([], dtype=int)
+            return df_pairs
+        list_rows, list_cols, list_dist = [], [], []
+        sq_norm = (self.xyz ** 2).sum(axis=1)
+        for start in range(0, len(positions), self.int_block_size):
+            block = positions[start:start + self.int_block_size]
+            # Block of queries against every well keeps memory at int_block_size x N
+            dist2 = sq_norm[block][:, None] + sq_norm[None, :] - 2.0 * self.xyz[block] @ self.xyz.T
+            dist = np.sqrt(np.maximum(dist2, 0.0))
+            dist[np.arange(len(block)), block] = np.inf
+            nearest = np.argpartition(dist, int_k - 1, axis=1)[:, :int_k]
+            # Re-measure the selected pairs directly, the expanded form above loses precision at earth scale
+            nearest_dist = np.sqrt(((self.xyz[nearest] - self.xyz[block][:, None, :]) ** 2).sum(axis=2))
+            order = np.argsort(nearest_dist, axis=1)
+            list_rows.append(np.repeat(block, int_k))
+            list_cols.append(np.take_along_axis(nearest, order, axis=1).ravel())
+            list_dist.append(np.take_along_axis(nearest_dist, order, axis=1).ravel())
+        df_pairs = self._pairs(np.concatenate(list_rows), np.concatenate(list_cols),
+                               self._arc(np.concatenate(list_dist)))
+        df_pairs["rank"] = np.tile(np.arange(1, int_k + 1), len(positions))
+        return df_pairs
+
 
 class DatasourceEDA:
     def __init__(self):
@@ -2557,6 +5559,75 @@ class DatasourceEDA:
         results = mydata.json()
         return results
     
+    def buildWellIndex(self, field_name: Optional[str] = None, use_utm: bool = False):
+        """
+        {
+        "description": "Build the local WellSpatialIndex from the cached wellmaster (fetched once if Datasource was not initialised) and keep it in the session",
+        "arguments" : {
+            field_name: "None | Field A",
+            use_utm: False
+            },
+        "return": "WellSpatialIndex"
+        }
+        """
+        list_wells = getattr(self.master, "wellmasterdict_full", None)
+        if not list_wells:
+            list_wells = self.master._getMaster("datasource", "wellmaster")
+        if field_name:
+            int_field_id = self.master.fieldmasterdict[field_name]
+            list_wells = [x for x in list_wells if x.get("field_fk") == int_field_id]
+        self.master.well_spatial_index = WellSpatialIndex(list_wells, use_utm=use_utm)
+        return self.master.well_spatial_index
+
+    def getNearByWells(self, well_names=None, radius: Optional[float] = None, k: Optional[int] = None):
+        """
+        {
+        "description": "Local counterpart of runNearByWells answered from the session WellSpatialIndex, for one well, a list or all wells (None). Either radius in metres or k nearest",
+        "arguments" : {
+            well_names: "Well A | ['Well A', 'Well B'] | None",
+            radius: 1000.0,
+            k: None
+            },
+        "return": "WellResultsParser, one record per neighbour with its wellmaster fields, reference_well_name and distance"
+        }
+        """
+        if (radius is None) == (k is None):
+            raise ValueError("Please provide either radius or k")
+        index = getattr(self.master, "well_spatial_index", None)
+        if index is None:
+            index = self.buildWellIndex()
+        if radius is not None:
+            df_pairs = index.queryRadius(well_names, float_radius=radius)
+        else:
+            df_pairs = index.queryNearest(well_names, int_k=k)
+        df_results = df_pairs.merge(index.df_wells, on="well_name", how="left")
+        results = {}
+        results["data"] = df_results.to_dict(orient="records")
+        return alanaResults.WellResultsParser(results)
+
+    def getWellProximity(self, radius: float, list_wells: Optional[list] = None, field_name: Optional[str] = None,
+                         use_utm: bool = False, int_block_size: int = 1024):
+        """
+        {
+        "description": "Neighbours within radius metres for every well of a field at once, as a sparse adjacency. Coordinates come from list_wells (e.g. Datasource().getWells(field_name).list) or from the session WellSpatialIndex",
+        "arguments" : {
+            radius: 1000.0,
+            list_wells: "None | getWells().list",
+            field_name: "None | Field A",
+            use_utm: False,
+            int_block_size: 1024
+            },
+        "return": "ProximityResultsParser, .df/.list in the getNearByWells layout (reference_well_name, well_name, distance), .csr and .neighbors(well_name)"
+        }
+        """
+        if list_wells is not None:
+            index = WellSpatialIndex(list_wells, use_utm=use_utm, int_block_size=int_block_size)
+        elif field_name is not None or getattr(self.master, "well_spatial_index", None) is None:
+            index = self.buildWellIndex(field_name=field_name, use_utm=use_utm)
+        else:
+            index = self.master.well_spatial_index
+        return alanaResults.ProximityResultsParser(index.proximityMatrix(float_radius=radius))
+
     def invert_dict(self,input_dict:dict):
         """
         {
@@ -2712,6 +5783,18 @@ class WellType(_DynamicAppClass):
             dict_welltype_results = mydata.json()
             self.master._print(f"dict_welltype_results:{dict_welltype_results}")
             return dict_welltype_results
+
+    def submitWellType(self, dict_welltype, job_pool=None):
+        """
+        {
+        "description": "Non-blocking runWellType: queues the run on a JobPool (the session pool by default) and returns its AlanaJob",
+        "arguments": {"dict_welltype": "same as runWellType", "job_pool": "None | JobPool"},
+        "return": "AlanaJob, job.result() gives the runWellType response"
+        }
+        """
+        job_pool = job_pool or self.master._getJobPool()
+        return job_pool.submit(f"welltype {dict_welltype.get('well_names[]', '')}", "get",
+                               "/api/welltype/welltype_calc/", data=dict_welltype)
     
     def editWellTypeMaster(self, master_fk: int, dict_edit_master: dict):
         dict_edit_master = self.master._editMaster("welltype", "welltypemaster", dict_edit_master, str(master_fk))
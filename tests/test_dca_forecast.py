@@ -0,0 +1,71 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alanapy"))
+import alanapy  # noqa: E402
+
+
+@pytest.fixture
+def dca():
+    master = alanapy.Singleton().master
+    master.wellmasterdict = {"W3": 3}
+    mydca = object.__new__(alanapy.DCA)
+    mydca.master = master
+    return mydca
+
+
+def _storedCase(master, rates, dates, str_forecast_date="2023-01-01"):
+    """
+    dcacase record as runDCA stores it: zero months are left out of the fit and primary_phase_forecast_rate is the
+    last measured rate
+    """
+    is_positive = rates > 0
+    x_selected = [str(x) for x in dates[is_positive]]
+    y_selected = rates[is_positive].tolist()
+    template = {"x_selected": x_selected, "y_selected": y_selected, "arps_type": "HYPE",
+                "primary_phase_forecast_rate": float(rates[-1]), "forecast_months": 240,
+                "primary_forecast_date": str_forecast_date, "fc_rate_choice": "LASTVAL",
+                "primary_phase_abandonment": 1.0}
+    forecast = alanapy.ArpsEngine().fitForecast([dict(template)])[0]
+    case = master._buildDCASaveDict(7, 3, forecast, x_selected, y_selected, template)
+    case["id"] = 11
+    return case
+
+
+def _shutInWell():
+    dates = pd.date_range("2020-01-01", periods=36, freq="MS").to_numpy(dtype="datetime64[D]")
+    rates = alanapy.ArpsEngine.rate(800.0, 0.6, 0.8, (dates - dates[0]).astype(float))
+    rates[10:13] = 0.0
+    rates[-4:] = 0.0
+    return rates, dates
+
+
+def test_forecast_dca_cases_anchors_on_fit_with_trailing_zeros(dca):
+    rates, dates = _shutInWell()
+    case = _storedCase(dca.master, rates, dates)
+    assert case["primary_phase_fit_rate"] == 0.0
+
+    df_params = dca._dcaCaseParams([case])
+    assert df_params.loc[0, "rate"] == pytest.approx(case["primary_plot_data"]["fit"][-1])
+
+    df_reserves = dca.forecastDCACases(list_cases=[case])["df_reserves"]
+    float_remaining = df_reserves.loc[0, "remaining_reserves"]
+    assert float_remaining > 0
+    assert float_remaining == pytest.approx(case["oil_reserves"], rel=0.02)
+    assert df_reserves.loc[0, "eur"] == pytest.approx(float_remaining)
+
+
+def test_monte_carlo_dca_with_trailing_zeros(dca):
+    rates, dates = _shutInWell()
+    case = _storedCase(dca.master, rates, dates)
+    dict_mc = dca.monteCarloDCA(list_cases=[case], int_realizations=400, seed=3)
+
+    row = dict_mc["df_reserves"].iloc[0]
+    assert 0 < row["reserves_p90"] <= row["reserves_p50"] <= row["reserves_p10"]
+    assert row["reserves_p50"] == pytest.approx(case["oil_reserves"], rel=0.15)
+    assert all(value > 0 for value in dict_mc["portfolio_reserves"].values())
+    assert (dict_mc["df_portfolio"][["oil_p10", "oil_p50", "oil_p90"]].sum() > 0).all()